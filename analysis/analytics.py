@@ -0,0 +1,184 @@
+import os
+import glob
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from storage.experiment_file import ExperimentFile, is_experiment_log, timed_rows
+from constants.analysis import ANALYSIS_CACHE_DIRECTORY, PUMP_ML_PER_REV_PER_MM2
+
+logger = logging.getLogger(__name__)
+
+# Columns kept as text, everything else is converted to float (placeholders become NaN)
+TEXT_COLUMNS = ('Gas', 'MFC status')
+
+
+class Run:
+    '''A parsed experiment log: header metadata and one column array per data column, plus timestamps'''
+    def __init__(self, file_name, metadata, data):
+        self.file_name = file_name
+        self.metadata = metadata
+        self.data = data
+
+
+def cache_path(file_name, suffix='.npz'):
+    stat = os.stat(file_name)
+    key = f'{os.path.abspath(file_name)}|{stat.st_size}|{stat.st_mtime_ns}'
+    return os.path.join(ANALYSIS_CACHE_DIRECTORY, f'{hashlib.sha1(key.encode()).hexdigest()}{suffix}')
+
+
+def run_metadata(experiment):
+    return {
+        'path': experiment.file_name,
+        'date': experiment.date.isoformat() if experiment.date else None,
+        'name': experiment.name,
+        'author': experiment.author,
+        'parameters': {key: value for key, (value, _) in experiment.header['Parameters'].items()},
+        'units': {key: unit for key, (_, unit) in experiment.header['Parameters'].items()}
+    }
+
+
+def parse_run(file_name):
+    '''Read the header and data section of an experiment log into a pandas DataFrame'''
+    with ExperimentFile(file_name) as experiment:
+        metadata = run_metadata(experiment)
+        columns = experiment.columns[1:]
+        times = []
+        cells = []
+        for time, row in timed_rows(experiment.data_rows(), experiment.date):
+            times.append(time)
+            cells.append(row[:len(columns)] + [''] * (len(columns) - len(row)))
+
+    data = pd.DataFrame(cells, columns=columns)
+    for column in columns:
+        if column not in TEXT_COLUMNS:
+            data[column] = pd.to_numeric(data[column], errors='coerce')
+    data.insert(0, 'Timestamp', pd.to_datetime(times))
+    return Run(file_name, metadata, data)
+
+
+def load_run(file_name, use_cache=True):
+    '''Parsed run, from the cache when the file has not changed since it was last parsed'''
+    path = cache_path(file_name) if use_cache else None
+    if path and os.path.exists(path):
+        with np.load(path, allow_pickle=False) as cached:
+            metadata = json.loads(str(cached['__metadata__']))
+            columns = json.loads(str(cached['__columns__']))
+            data = pd.DataFrame({column: cached[f'column_{index}'] for index, column in enumerate(columns)})
+            data['Timestamp'] = pd.to_datetime(data['Timestamp'])
+        return Run(file_name, metadata, data)
+
+    run = parse_run(file_name)
+    if path:
+        os.makedirs(ANALYSIS_CACHE_DIRECTORY, exist_ok=True)
+        arrays = {
+            f'column_{index}': (
+                run.data[column].to_numpy('datetime64[ns]').astype('int64') if column == 'Timestamp'
+                else run.data[column].to_numpy(dtype=str if column in TEXT_COLUMNS else float)
+            )
+            for index, column in enumerate(run.data.columns)
+        }
+        np.savez(path, __metadata__=json.dumps(run.metadata), __columns__=json.dumps(list(run.data.columns)), **arrays)
+    return run
+
+
+def integrate(values, seconds):
+    '''Trapezoidal integral over time, ignoring samples where the value is missing'''
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return np.nan
+    return float(np.trapezoid(values[valid], seconds[valid]))
+
+
+def analyse(run):
+    '''
+    Summary of one run:
+      energy_Wh            integral of Voltage * Current, summed over every PSU channel
+      gas_used_cm3         integral of the mass flow (sccm) over minutes
+      liquid_used_mL       integral of pump speed (rpm) * mL/rev of the tubing bore over minutes
+      energy_per_litre_gas Wh per litre of gas, the efficiency of the run
+    and count/mean/std/min/max of every numeric channel.
+    '''
+    data = run.data
+    seconds = (data['Timestamp'] - data['Timestamp'].iloc[0]).dt.total_seconds().to_numpy() if len(data) else np.array([])
+
+    def column(name):
+        return data[name].to_numpy(dtype=float) if name in data else np.full(len(data), np.nan)
+
+    power = column('Voltage') * column('Current')
+    channel = 2
+    while f'Voltage {channel}' in data:
+        power = power + column(f'Voltage {channel}') * column(f'Current {channel}')
+        channel += 1
+    energy_wh = integrate(power, seconds) / 3600 if len(data) else np.nan
+    gas_cm3 = integrate(column('Flow rate'), seconds) / 60 if len(data) else np.nan
+
+    tubing = run.metadata['parameters'].get('Tubing size')
+    ml_per_rev = PUMP_ML_PER_REV_PER_MM2 * tubing ** 2 if isinstance(tubing, float) else np.nan
+    liquid_ml = integrate(column('Pump speed') * ml_per_rev, seconds) / 60 if len(data) else np.nan
+
+    summary = {
+        'path': run.file_name,
+        'date': run.metadata['date'],
+        'name': run.metadata['name'],
+        'author': run.metadata['author'],
+        'samples': len(data),
+        'duration_s': float(seconds[-1]) if len(data) else 0.0,
+        'energy_Wh': energy_wh,
+        'mean_power_W': float(np.nanmean(power)) if np.isfinite(power).any() else np.nan,
+        'gas_used_cm3': gas_cm3,
+        'liquid_used_mL': liquid_ml,
+        'energy_per_litre_gas': energy_wh / (gas_cm3 / 1000) if gas_cm3 and np.isfinite(gas_cm3) else np.nan
+    }
+    for name in data.columns[1:]:
+        if name in TEXT_COLUMNS:
+            continue
+        values = data[name]
+        if values.notna().any():
+            summary[f'{name} mean'] = values.mean()
+            summary[f'{name} std'] = values.std()
+            summary[f'{name} min'] = values.min()
+            summary[f'{name} max'] = values.max()
+    return summary
+
+
+def analyse_file(file_name):
+    try:
+        return analyse(load_run(file_name))
+    except Exception as e:
+        logger.error(f'Could not analyse {file_name}. Error: {e}')
+        return {'path': file_name, 'error': str(e)}
+
+
+def analyse_runs(file_names, workers=None):
+    '''Analyse runs in parallel worker processes, one row per run'''
+    file_names = list(file_names)
+    if len(file_names) <= 1:
+        results = [analyse_file(file_name) for file_name in file_names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyse_file, file_names, chunksize=max(1, len(file_names) // 32)))
+    return pd.DataFrame(results)
+
+
+def analyse_archive(directory='output', workers=None):
+    file_names = sorted(
+        file_name for file_name in glob.glob(os.path.join(directory, '*'))
+        if is_experiment_log(file_name)
+    )
+    return analyse_runs(file_names, workers=workers)
+
+
+if __name__ == '__main__':
+    # python -m analysis.analytics [directory] [summary.csv]
+    import sys
+
+    results = analyse_archive(sys.argv[1] if len(sys.argv) > 1 else 'output')
+    if len(sys.argv) > 2:
+        results.to_csv(sys.argv[2], index=False)
+    else:
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(results[['date', 'name', 'author', 'samples', 'duration_s', 'energy_Wh', 'gas_used_cm3', 'liquid_used_mL']])
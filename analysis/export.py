@@ -0,0 +1,210 @@
+import os
+import glob
+import json
+import logging
+import warnings
+import pandas as pd
+from datetime import date
+
+from analysis.analytics import TEXT_COLUMNS, run_metadata
+from storage.experiment_file import ExperimentFile, is_experiment_log, parse_file_name, timed_rows
+from storage.segmented_log import MANIFEST_SUFFIX
+from constants.analysis import EXPORT_DIRECTORY, EXPORT_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Needs pyarrow for Parquet and PyTables for HDF5, imported only when that format is used
+EXPORT_FORMATS = {'parquet': '.parquet', 'hdf5': '.h5'}
+
+# Columns logged as True/False, everything else that is not text is a float
+BOOLEAN_COLUMNS = ('Pump running',)
+
+# Longest text kept per text column in HDF5, which fixes string widths when the table is created
+HDF5_TEXT_SIZE = 64
+
+
+def export_path(file_name, export_format, directory=EXPORT_DIRECTORY):
+    base_name = os.path.basename(file_name)
+    for suffix in (MANIFEST_SUFFIX, '.csv'):
+        base_name = base_name.removesuffix(suffix)
+    return os.path.join(directory, base_name + EXPORT_FORMATS[export_format])
+
+
+def is_exported(file_name, destination):
+    '''An export is up to date if it was written after the run was last changed'''
+    return os.path.exists(destination) and os.path.getmtime(destination) >= os.path.getmtime(file_name)
+
+
+def typed_frame(times, cells, columns):
+    data = pd.DataFrame(cells, columns=columns)
+    for column in columns:
+        if column in TEXT_COLUMNS:
+            data[column] = data[column].replace('', None).astype('string')
+        elif column in BOOLEAN_COLUMNS:
+            data[column] = data[column].map({'True': True, 'False': False}).astype('boolean')
+        else:
+            data[column] = pd.to_numeric(data[column], errors='coerce').astype('float64')
+    data.insert(0, 'Timestamp', pd.to_datetime(times))
+    return data
+
+
+def read_chunks(experiment, chunk_rows=EXPORT_CHUNK_ROWS):
+    '''Typed DataFrames of at most chunk_rows rows, timestamped from the run date and the HH:MM:SS column'''
+    columns = experiment.columns[1:]
+    times = []
+    cells = []
+    for time, row in timed_rows(experiment.data_rows(), experiment.date):
+        times.append(time)
+        cells.append(row[:len(columns)] + [''] * (len(columns) - len(row)))
+        if len(cells) == chunk_rows:
+            yield typed_frame(times, cells, columns)
+            times = []
+            cells = []
+    if cells or not columns:
+        yield typed_frame(times, cells, columns)
+
+
+def write_parquet(destination, experiment, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = [pa.field('Timestamp', pa.timestamp('ns'))]
+    for column in experiment.columns[1:]:
+        if column in TEXT_COLUMNS:
+            fields.append(pa.field(column, pa.string()))
+        elif column in BOOLEAN_COLUMNS:
+            fields.append(pa.field(column, pa.bool_()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    schema = pa.schema(fields, metadata={'experiment': json.dumps(run_metadata(experiment))})
+
+    rows = 0
+    # Every chunk becomes its own row group, so only one chunk is ever held in memory
+    with pq.ParquetWriter(destination, schema, compression='zstd') as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def write_hdf5(destination, experiment, chunks):
+    import tables
+
+    rows = 0
+    with warnings.catch_warnings(), pd.HDFStore(destination, mode='w', complevel=5, complib='blosc') as store:
+        # Column names such as 'Flow rate' are fine, they just cannot be used as PyTables attributes
+        warnings.simplefilter('ignore', tables.NaturalNameWarning)
+        for chunk in chunks:
+            chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+            # PyTables has no nullable text or boolean columns: text is stored as '' when missing,
+            # Pump running as 1.0/0.0 with NaN when missing
+            for column in chunk.columns:
+                if column in TEXT_COLUMNS:
+                    chunk[column] = chunk[column].fillna('').astype(object)
+                elif column in BOOLEAN_COLUMNS:
+                    chunk[column] = chunk[column].astype('float64')
+            store.append(
+                'samples', chunk, format='table', index=False, data_columns=['Timestamp'],
+                min_itemsize={column: HDF5_TEXT_SIZE for column in chunk.columns if column in TEXT_COLUMNS}
+            )
+            rows += len(chunk)
+        if 'samples' in store:
+            store.create_table_index('samples', columns=['Timestamp'], optlevel=6, kind='medium')
+            store.get_storer('samples').attrs.experiment = json.dumps(run_metadata(experiment))
+        else:
+            # PyTables writes no table for a run without rows, so the metadata and columns go on the file itself
+            attributes = store.get_node('/')._v_attrs
+            attributes.experiment = json.dumps(run_metadata(experiment))
+            attributes.columns = json.dumps(['Timestamp'] + experiment.columns[1:])
+    return rows
+
+
+def export_run(file_name, export_format='parquet', directory=EXPORT_DIRECTORY, chunk_rows=EXPORT_CHUNK_ROWS, overwrite=False):
+    '''
+    Stream one experiment log into a Parquet or HDF5 file in directory, chunk_rows rows at a time.
+    Returns the exported file name, or None when an up to date export already exists.
+    '''
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format}')
+
+    destination = export_path(file_name, export_format, directory)
+    if not overwrite and is_exported(file_name, destination):
+        logger.debug(f'{file_name} already exported to {destination}')
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    # Written under a temporary name, so an interrupted export is never taken for a finished one
+    temporary = destination + '.tmp'
+    writer = write_parquet if export_format == 'parquet' else write_hdf5
+    try:
+        with ExperimentFile(file_name) as experiment:
+            rows = writer(temporary, experiment, read_chunks(experiment, chunk_rows))
+        os.replace(temporary, destination)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    logger.info(f'Exported {file_name} to {destination} ({rows} rows)')
+    return destination
+
+
+def export_archive(directory='output', since=None, until=None, export_format='parquet', destination=EXPORT_DIRECTORY, chunk_rows=EXPORT_CHUNK_ROWS):
+    '''
+    Export every run in directory dated between since and until (dates or 'YYYY-MM-DD', inclusive),
+    one run at a time. Runs already exported are skipped. Returns the names of the files written.
+    '''
+    since = date.fromisoformat(since) if isinstance(since, str) else since
+    until = date.fromisoformat(until) if isinstance(until, str) else until
+
+    exported = []
+    for file_name in sorted(glob.glob(os.path.join(directory, '*'))):
+        if not is_experiment_log(file_name):
+            continue
+        run_date, _ = parse_file_name(file_name)
+        if (since or until) and run_date is None:
+            continue
+        if (since and run_date < since) or (until and run_date > until):
+            continue
+
+        try:
+            file = export_run(file_name, export_format, destination, chunk_rows)
+        except Exception as e:
+            logger.error(f'Could not export {file_name}. Error: {e}')
+            continue
+        if file:
+            exported.append(file)
+    return exported
+
+
+def read_export(file_name):
+    '''Exported run back as (metadata, DataFrame)'''
+    if file_name.endswith(EXPORT_FORMATS['parquet']):
+        import pyarrow.parquet as pq
+        table = pq.read_table(file_name)
+        return json.loads(table.schema.metadata[b'experiment']), table.to_pandas()
+
+    with pd.HDFStore(file_name, mode='r') as store:
+        if 'samples' not in store:
+            attributes = store.get_node('/')._v_attrs
+            return json.loads(attributes.experiment), pd.DataFrame(columns=json.loads(attributes.columns))
+        return json.loads(store.get_storer('samples').attrs.experiment), store['samples']
+
+
+if __name__ == '__main__':
+    # python -m analysis.export <run file or directory> [parquet|hdf5] [since YYYY-MM-DD] [until YYYY-MM-DD]
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s - %(message)s', datefmt='%H:%M:%S')
+    source = sys.argv[1] if len(sys.argv) > 1 else 'output'
+    export_format = sys.argv[2] if len(sys.argv) > 2 else 'parquet'
+
+    if os.path.isdir(source):
+        exported = export_archive(
+            source,
+            since=sys.argv[3] if len(sys.argv) > 3 else None,
+            until=sys.argv[4] if len(sys.argv) > 4 else None,
+            export_format=export_format
+        )
+        print(f'{len(exported)} run(s) exported to {EXPORT_DIRECTORY}')
+    else:
+        print(export_run(source, export_format) or 'Already exported')
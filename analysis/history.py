@@ -0,0 +1,199 @@
+import os
+import json
+import shutil
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+
+from analysis.analytics import TEXT_COLUMNS, cache_path
+from analysis.export import read_chunks
+from storage.segmented_log import MANIFEST_SUFFIX
+from storage.experiment_file import ExperimentFile, EVENT_MARKER
+from constants.analysis import HISTORY_CHUNK_ROWS, HISTORY_POINTS
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE_NAME = 'metadata.json'
+
+
+def history_directory(file_name):
+    return cache_path(file_name, suffix='.history')
+
+
+def is_prepared(file_name):
+    return os.path.exists(os.path.join(history_directory(file_name), METADATA_FILE_NAME))
+
+
+def channel_chunks(experiment, channels, chunk_rows):
+    '''
+    (seconds since midnight of the run date, {channel: values}) for every chunk of the data section.
+    Plain CSV logs are read with the pandas C parser, far faster than the row by row reader used
+    for segmented logs.
+    '''
+    if experiment.file_name.endswith(MANIFEST_SUFFIX):
+        for chunk in read_chunks(experiment, chunk_rows):
+            midnight = pd.Timestamp(experiment.date) if experiment.date else pd.Timestamp(1900, 1, 1)
+            yield (
+                (chunk['Timestamp'] - midnight).dt.total_seconds().to_numpy('<f8'),
+                {channel: chunk[channel].to_numpy(dtype='<f8', na_value=np.nan) for channel in channels}
+            )
+        return
+
+    # Header rows are one line each, so the data starts after as many lines. Rows shorter than
+    # the header (older logs) are padded with NaN.
+    if not experiment.columns:
+        return
+    try:
+        chunks = pd.read_csv(
+            experiment.file_name, skiprows=len(experiment.header_rows), header=None, names=experiment.columns,
+            chunksize=chunk_rows, skip_blank_lines=True
+        )
+    except pd.errors.EmptyDataError:
+        # A run stopped before its first sample, it is converted to empty channel files
+        return
+    day = 0
+    last = None
+    for chunk in chunks:
+        # Event rows hold the marker where the first channel would be
+        marker = chunk[experiment.columns[1]]
+        if not pd.api.types.is_numeric_dtype(marker):
+            chunk = chunk[marker != EVENT_MARKER]
+            if chunk.empty:
+                continue
+        seconds = pd.to_timedelta(chunk['Time']).dt.total_seconds().to_numpy('<f8')
+        # A time earlier than the one before it is the next day
+        rollover = np.diff(seconds, prepend=seconds[0] if last is None else last) < 0
+        last = seconds[-1]
+        days = day + np.cumsum(rollover)
+        day = int(days[-1])
+
+        values = {}
+        for channel in channels:
+            column = chunk[channel]
+            if not pd.api.types.is_numeric_dtype(column):
+                # Placeholders such as 'V' become NaN, True/False become 1/0. Replaced by text so the
+                # column is never downcast by replace itself
+                column = pd.to_numeric(column.replace({'True': '1', 'False': '0'}), errors='coerce')
+            values[channel] = column.to_numpy(dtype='<f8', na_value=np.nan)
+        yield seconds + days * 86400, values
+
+
+def prepare_history(file_name, chunk_rows=HISTORY_CHUNK_ROWS):
+    '''
+    Convert a run once into a raw float64 file per numeric channel plus the seconds since the start of
+    the run, reading chunk_rows rows at a time. Later opens only memory-map these files.
+    '''
+    directory = history_directory(file_name)
+    if os.path.exists(os.path.join(directory, METADATA_FILE_NAME)):
+        return directory
+
+    # Built under a temporary name, so an interrupted conversion is never taken for a finished one
+    temporary = directory + '.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    with ExperimentFile(file_name) as experiment:
+        channels = [column for column in experiment.columns[1:] if column not in TEXT_COLUMNS]
+        files = [open(os.path.join(temporary, f'{index}.f64'), 'wb') for index in range(len(channels) + 1)]
+        start = None
+        rows = 0
+        try:
+            for seconds, values in channel_chunks(experiment, channels, chunk_rows):
+                if not len(seconds):
+                    continue
+                if start is None:
+                    start = seconds[0]
+                files[0].write((seconds - start).tobytes())
+                for channel_file, channel in zip(files[1:], channels):
+                    channel_file.write(values[channel].tobytes())
+                rows += len(seconds)
+        finally:
+            for channel_file in files:
+                channel_file.close()
+
+        run_date = pd.Timestamp(experiment.date) if experiment.date else pd.Timestamp(1900, 1, 1)
+        metadata = {
+            'path': file_name,
+            'name': experiment.name,
+            'author': experiment.author,
+            'start': (run_date + pd.Timedelta(seconds=start)).isoformat() if start is not None else None,
+            'rows': rows,
+            'channels': channels
+        }
+
+    with open(os.path.join(temporary, METADATA_FILE_NAME), 'w') as f:
+        json.dump(metadata, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+    logger.debug(f'History of {file_name} prepared: {rows} rows, {len(channels)} channels')
+    return directory
+
+
+def decimate(seconds, values, points):
+    '''
+    Min and max of each of points // 2 buckets, in time order, so short spikes survive
+    however far the view is zoomed out.
+    '''
+    buckets = max(1, points // 2)
+    size = -(-len(values) // buckets)
+    padding = buckets * size - len(values)
+    padded = np.concatenate([values, np.full(padding, np.nan)]).reshape(buckets, size)
+    bucket_seconds = np.concatenate([seconds, np.full(padding, seconds[-1])]).reshape(buckets, size)
+
+    with warnings.catch_warnings():
+        # Buckets with no valid reading stay NaN and leave a gap in the line
+        warnings.simplefilter('ignore', RuntimeWarning)
+        minimum = np.nanmin(padded, axis=1)
+        maximum = np.nanmax(padded, axis=1)
+
+    return np.repeat(bucket_seconds[:, 0], 2), np.column_stack([minimum, maximum]).ravel()
+
+
+class RunHistory:
+    '''
+    A finished run opened for viewing. Channels are memory-mapped, so opening costs the same whatever
+    the length of the run and only the part of the file being viewed is ever read.
+    '''
+    def __init__(self, file_name):
+        self.directory = prepare_history(file_name)
+        with open(os.path.join(self.directory, METADATA_FILE_NAME), 'r') as f:
+            self.metadata = json.load(f)
+
+        self.file_name = file_name
+        self.name = self.metadata['name']
+        self.rows = self.metadata['rows']
+        self.channels = self.metadata['channels']
+        self.seconds = self.channel_array(0)
+
+    def channel_array(self, index):
+        if not self.rows:
+            return np.empty(0)
+        return np.memmap(os.path.join(self.directory, f'{index}.f64'), dtype='<f8', mode='r')
+
+    @property
+    def duration(self):
+        return float(self.seconds[-1]) if self.rows else 0.0
+
+    def bounds(self, start=None, end=None):
+        '''First and one past the last sample index between start and end seconds'''
+        first = int(np.searchsorted(self.seconds, start, side='left')) if start is not None else 0
+        last = int(np.searchsorted(self.seconds, end, side='right')) if end is not None else self.rows
+        return first, last
+
+    def samples_between(self, start=None, end=None):
+        first, last = self.bounds(start, end)
+        return max(0, last - first)
+
+    def window(self, channel, start=None, end=None, points=HISTORY_POINTS):
+        '''
+        (seconds, values) of channel between start and end seconds: every sample when there are
+        no more than points in the window, the min/max envelope otherwise.
+        '''
+        first, last = self.bounds(start, end)
+        seconds = self.seconds[first:last]
+        values = self.channel_array(self.channels.index(channel) + 1)[first:last]
+
+        if len(values) <= points:
+            return np.array(seconds), np.array(values)
+        return decimate(seconds, values, points)
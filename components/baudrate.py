@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import logging
+
+from constants.ports import BAUDRATE, BAUDRATE_MAX, BAUDRATE_FILE
+
+logger = logging.getLogger(__name__)
+
+# Time given to an instrument to reconfigure its port after a baud rate command
+BAUDRATE_SETTLE_TIME = 0.5
+
+
+def load_baudrates(file_name=BAUDRATE_FILE):
+    try:
+        with open(file_name, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remembered_baudrate(port, file_name=BAUDRATE_FILE):
+    '''Rate last negotiated on port, or BAUDRATE if there is none'''
+    return load_baudrates(file_name).get(port, BAUDRATE)
+
+
+def remember_baudrate(port, baudrate, file_name=BAUDRATE_FILE):
+    baudrates = load_baudrates(file_name)
+    if baudrates.get(port) == baudrate:
+        return
+    baudrates[port] = baudrate
+
+    os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+    temporary = file_name + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(baudrates, f, indent=4)
+    os.replace(temporary, file_name)
+
+
+def answers(driver):
+    '''Garbled replies at the wrong rate can fail in any number of ways, all of them mean no'''
+    try:
+        driver.ser.reset_input_buffer()
+        return driver.probe()
+    except Exception:
+        return False
+
+
+def detect_baudrate(driver):
+    '''Find the rate the device is talking at, trying the current one first. Returns None if it never answers.'''
+    current = driver.ser.baudrate
+    for baudrate in [current] + [rate for rate in driver.BAUDRATES if rate != current]:
+        driver.ser.baudrate = baudrate
+        if answers(driver):
+            return baudrate
+
+    driver.ser.baudrate = current
+    return None
+
+
+def switch_baudrate(driver, baudrate):
+    '''Tell the device to change rate and follow it. Goes back to the old rate if the device does not answer.'''
+    command = driver.baudrate_command(baudrate)
+    if command is None:
+        return False
+
+    previous = driver.ser.baudrate
+    driver.send_command(command)
+    time.sleep(BAUDRATE_SETTLE_TIME)
+    driver.ser.baudrate = baudrate
+    if answers(driver):
+        return True
+
+    driver.ser.baudrate = previous
+    return False
+
+
+def negotiate_baudrate(driver, port, name, maximum=BAUDRATE_MAX):
+    '''
+    Detect the device's rate on port, switch it to the highest supported rate up to maximum where
+    the device can be switched remotely, and remember the result for the port. Returns the rate in use.
+    '''
+    baudrate = detect_baudrate(driver)
+    if baudrate is None:
+        logger.warning(f'{name} did not answer at any of {driver.BAUDRATES} baud')
+        return driver.ser.baudrate
+
+    target = max((rate for rate in driver.BAUDRATES if rate <= maximum), default=baudrate)
+    if target > baudrate:
+        if switch_baudrate(driver, target):
+            logger.info(f'{name} switched from {baudrate} to {target} baud')
+            baudrate = target
+        elif driver.baudrate_command(target) is not None:
+            logger.warning(f'{name} did not answer after switching to {target} baud, staying at {baudrate} baud')
+
+    remember_baudrate(port, baudrate)
+    return baudrate
+
+
+def benchmark(driver, readings=20):
+    '''Readings per second and average seconds per reading of driver.get_reading()'''
+    start = time.perf_counter()
+    for _ in range(readings):
+        driver.get_reading()
+    elapsed = time.perf_counter() - start
+    return readings / elapsed, elapsed / readings
+
+
+if __name__ == '__main__':
+    # Compare reading throughput before and after negotiating a higher rate
+    # python -m components.baudrate mfc [readings]
+    import sys
+    from constants.ports import PSU_PORT, PUMP_PORT, MFC_PORT, STIRRER_PORT, TIMEOUT
+    from components.powerSupply import PowerSupply
+    from components.pump import Pump
+    from components.mfc import MassFlowController
+    from components.stirrer import Stirrer
+
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s - %(message)s', datefmt='%H:%M:%S')
+    devices = {
+        'psu': (PowerSupply, PSU_PORT, 'PSU'),
+        'pump': (Pump, PUMP_PORT, 'Pump'),
+        'mfc': (MassFlowController, MFC_PORT, 'MFC'),
+        'stirrer': (Stirrer, STIRRER_PORT, 'Stirrer')
+    }
+    driver_type, port, name = devices[sys.argv[1] if len(sys.argv) > 1 else 'mfc']
+    readings = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with driver_type(port=port, baudrate=remembered_baudrate(port), timeout=TIMEOUT) as driver:
+        before = detect_baudrate(driver)
+        before_rate, before_time = benchmark(driver, readings)
+        after = negotiate_baudrate(driver, port, name)
+        after_rate, after_time = benchmark(driver, readings)
+
+    print(f'{name} at {before} baud: {before_rate:.2f} readings/s ({before_time * 1000:.1f} ms each)')
+    print(f'{name} at {after} baud: {after_rate:.2f} readings/s ({after_time * 1000:.1f} ms each)')
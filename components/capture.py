@@ -0,0 +1,171 @@
+import os
+import time
+import struct
+import logging
+import threading
+from datetime import datetime
+
+from constants.capture import (
+    CAPTURE_ENABLED, CAPTURE_DIRECTORY, CAPTURE_RECORDS, CAPTURE_RECORD_SIZE, CAPTURE_DUMP_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'R3VCAP1\n'
+
+# Record: timestamp, device id, direction, original length, then the (possibly truncated) bytes
+RECORD_HEADER = struct.Struct('<dBBH')
+TX = 0
+RX = 1
+
+
+class SerialCapture:
+    '''
+    Preallocated ring buffer of timestamped TX/RX byte records for every device.
+
+    Records are fixed size so recording is a single struct.pack_into and a slice copy, with no
+    allocation; bytes beyond the record size are dropped but the original length is kept.
+    '''
+    def __init__(self, records=CAPTURE_RECORDS, record_size=CAPTURE_RECORD_SIZE):
+        self.records = records
+        self.record_size = record_size
+        self.payload_size = record_size - RECORD_HEADER.size
+        self.buffer = bytearray(records * record_size)
+        self.count = 0
+        self.devices = []
+        self.lock = threading.Lock()
+        self.last_error_dump = 0
+
+    def register(self, device_name):
+        with self.lock:
+            if device_name not in self.devices:
+                self.devices.append(device_name)
+            return self.devices.index(device_name)
+
+    def record(self, device_id, direction, data):
+        length = len(data)
+        stored = min(length, self.payload_size)
+        # The slot is written under the lock, so dump never copies a half-written record
+        # and a thread that has wrapped around cannot overwrite it at the same time
+        with self.lock:
+            offset = (self.count % self.records) * self.record_size
+            self.count += 1
+            RECORD_HEADER.pack_into(self.buffer, offset, time.time(), device_id, direction, length)
+            start = offset + RECORD_HEADER.size
+            self.buffer[start:start + stored] = data[:stored]
+
+    def dump(self, reason='on demand', directory=CAPTURE_DIRECTORY):
+        '''Write the buffered records, oldest first, to a new capture file and return its name'''
+        os.makedirs(directory, exist_ok=True)
+        file_name = os.path.join(directory, f'{datetime.now():%Y%m%d_%H%M%S_%f}.bin')
+
+        with self.lock:
+            count = self.count
+            first = max(0, count - self.records)
+            snapshot = bytes(self.buffer)
+            devices = list(self.devices)
+
+        with open(file_name, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<HH', self.record_size, len(devices)))
+            for name in devices:
+                encoded = name.encode()
+                f.write(struct.pack('<B', len(encoded)) + encoded)
+            for index in range(first, count):
+                offset = (index % self.records) * self.record_size
+                f.write(snapshot[offset:offset + self.record_size])
+
+        logger.info(f'Serial capture ({reason}): {count - first} record(s) written to {file_name}')
+        return file_name
+
+    def dump_on_error(self, reason):
+        if time.monotonic() - self.last_error_dump < CAPTURE_DUMP_INTERVAL:
+            return None
+        self.last_error_dump = time.monotonic()
+        return self.dump(reason)
+
+
+class CapturingSerial:
+    '''Wraps a serial.Serial and records every write and readline, everything else passes through'''
+    def __init__(self, ser, capture, device_name):
+        self.ser = ser
+        self.capture = capture
+        self.device_id = capture.register(device_name)
+
+    def write(self, data):
+        self.capture.record(self.device_id, TX, data)
+        return self.ser.write(data)
+
+    def readline(self, *args, **kwargs):
+        data = self.ser.readline(*args, **kwargs)
+        self.capture.record(self.device_id, RX, data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def __setattr__(self, name, value):
+        # Port settings such as baudrate go to the wrapped port
+        if name in ('ser', 'capture', 'device_id'):
+            super().__setattr__(name, value)
+        else:
+            setattr(self.ser, name, value)
+
+
+# Shared by every driver, None when capture is disabled
+capture = SerialCapture() if CAPTURE_ENABLED else None
+
+
+def capture_serial(ser, device_name):
+    '''Called by each driver on its serial port, returns the port unchanged when capture is disabled'''
+    if capture is None:
+        return ser
+    return CapturingSerial(ser, capture, device_name)
+
+
+def dump_capture(reason='on demand', on_error=False):
+    if capture is None:
+        return None
+    if on_error:
+        return capture.dump_on_error(reason)
+    return capture.dump(reason)
+
+
+def decode_capture(file_name):
+    '''Yield (timestamp, device name, 'TX'/'RX', bytes, truncated) for every record of a capture file'''
+    with open(file_name, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{file_name} is not a serial capture file')
+        record_size, device_count = struct.unpack('<HH', f.read(4))
+        devices = []
+        for _ in range(device_count):
+            length = f.read(1)[0]
+            devices.append(f.read(length).decode())
+
+        payload_size = record_size - RECORD_HEADER.size
+        while True:
+            record = f.read(record_size)
+            if len(record) < record_size:
+                return
+            timestamp, device_id, direction, length = RECORD_HEADER.unpack_from(record)
+            stored = min(length, payload_size)
+            data = record[RECORD_HEADER.size:RECORD_HEADER.size + stored]
+            yield timestamp, devices[device_id], 'TX' if direction == TX else 'RX', data, length > stored
+
+
+def format_transcript(file_name, device=None):
+    '''Readable transcript of a capture file, one line per exchange, optionally for a single device'''
+    lines = []
+    for timestamp, device_name, direction, data, truncated in decode_capture(file_name):
+        if device and device_name != device:
+            continue
+        time_text = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3]
+        text = repr(data)[2:-1] if data else '<nothing>'
+        lines.append(f'{time_text}  {device_name:<8} {direction}  {text}{" ...(truncated)" if truncated else ""}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    # python -m components.capture output/captures/<file>.bin [device]
+    import sys
+    print(format_transcript(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
@@ -0,0 +1,80 @@
+import queue
+import itertools
+import threading
+from concurrent.futures import Future
+
+# Lower runs first: an emergency stop jumps ahead of everything, stop ahead of setup, setup ahead of polling
+ESTOP = 0
+STOP = 1
+CONTROL = 2
+POLL = 3
+CLOSE = 4
+
+# Longest a caller waits for its command, including the commands queued ahead of it
+COMMAND_TIMEOUT = 10
+
+
+def default_priority(method_name):
+    if method_name == 'stop':
+        return STOP
+    if method_name.startswith('get_') or method_name == 'identify':
+        return POLL
+    return CONTROL
+
+
+class QueuedDevice:
+    '''
+    Gives a device driver its own command thread and priority queue, so only one exchange is ever
+    on its serial port at a time, whichever thread asks for it.
+
+    Calling a driver method through the proxy (psu.get_reading()) queues it and waits for the result.
+    submit() queues without waiting and returns a Future, used to send a command to several
+    devices in parallel. A command that is already on the wire always finishes first, then the
+    most urgent queued command goes next, so a stop never waits behind queued polls.
+    '''
+    def __init__(self, device, name):
+        self.device = device
+        self.name = name
+        self.commands = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.thread = threading.Thread(target=self.run_commands, name=f'{name} commands', daemon=True)
+        self.thread.start()
+
+    def submit(self, method_name, *args, priority=None, **kwargs):
+        future = Future()
+        if priority is None:
+            priority = default_priority(method_name)
+        # The sequence number keeps commands of equal priority in order
+        self.commands.put((priority, next(self.sequence), method_name, args, kwargs, future))
+        return future
+
+    def run_commands(self):
+        while True:
+            priority, _, method_name, args, kwargs, future = self.commands.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(getattr(self.device, method_name)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            if method_name == 'close':
+                return
+
+    def close(self):
+        # Queued behind everything else so pending commands still go out
+        self.submit('close', priority=CLOSE).result(timeout=COMMAND_TIMEOUT)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.device, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.submit(name, *args, **kwargs).result(timeout=COMMAND_TIMEOUT)
+        return call
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f'QueuedDevice({type(self.device).__name__})'
@@ -1,7 +1,18 @@
 import serial
 import time
+from collections import namedtuple
+
+from components.capture import capture_serial
+
+# One full Alicat data frame
+MassFlowReading = namedtuple('MassFlowReading', [
+    'pressure', 'temperature', 'volumetric_flow', 'mass_flow', 'setpoint', 'gas', 'status'
+])
 
 class MassFlowController:
+    # Alicat serial rates, changed with the NCB command
+    BAUDRATES = [2400, 9600, 19200, 38400, 57600, 115200]
+
     def __init__(self, port, baudrate, timeout):
         try:
             self.ser = serial.Serial(
@@ -12,6 +23,7 @@ class MassFlowController:
                 stopbits=serial.STOPBITS_ONE,
                 timeout=timeout
             )
+            self.ser = capture_serial(self.ser, 'MFC')
         except serial.SerialException as e:
             raise RuntimeError(f'Failed to connect to MFC: {e}')
 
@@ -24,13 +36,32 @@ class MassFlowController:
     def set_flow_rate(self, flow_rate):
         return self.send_command(f'As{flow_rate}')
 
-    def get_flow_rate(self):
+    def get_reading(self):
         # Gives all raw data from MFC
         raw_response = self.send_command('A')
 
+        # 0 - MFC name, 1 - PSIA, 2 - Temp, 3 - ccm, 4 - sccm, 5 - setpoint, 6 - gas type, 7+ - valve state / status codes
+        fields = raw_response.split()
+        return MassFlowReading(
+            pressure=float(fields[1]),
+            temperature=float(fields[2]),
+            volumetric_flow=float(fields[3]),
+            mass_flow=float(fields[4]),
+            setpoint=float(fields[5]),
+            gas=fields[6],
+            status=' '.join(fields[7:])
+        )
+
+    def get_flow_rate(self):
         # Only pick flow rate
-        # 0 - MFC name, 1 - PSIA, 2 - Temp, 3 - ccm, 4 - sccm, 5 - setpoint, 6 - gas type, 7 - valve state
-        return float(raw_response.split()[4])
+        return self.get_reading().mass_flow
+
+    def probe(self):
+        '''True if the MFC answers with a data frame at the current baud rate'''
+        return self.send_command('A').startswith('A ')
+
+    def baudrate_command(self, baudrate):
+        return f'ANCB {baudrate}'
 
     def start(self):
         return self.send_command('AC')
@@ -47,6 +78,13 @@ class MassFlowController:
         firmware = self.send_command('AVE')
         return {'manufacturer': manufacturer, 'firmware': firmware}
 
+    def self_test(self):
+        '''Identity query for the pre-flight check, raises if the MFC does not answer'''
+        info = self.get_info()
+        if not info['manufacturer']:
+            raise RuntimeError('No reply to the manufacturer query')
+        return f'{info["manufacturer"]} {info["firmware"]}'.strip()
+
     def close(self):
         self.ser.close()
 
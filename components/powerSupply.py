@@ -1,10 +1,21 @@
 import serial
 import time
+from collections import namedtuple
+
+from components.capture import capture_serial
 
 # from constants.ports import PSU_PORT, BAUDRATE, TIMEOUT
 
+PowerSupplyReading = namedtuple('PowerSupplyReading', ['voltage', 'current'])
+
 class PowerSupply:
-    def __init__(self, port, baudrate, timeout):
+    # Rates the RS-232 interface can be set to with SYST:COMM:SER:BAUD
+    BAUDRATES = [9600, 19200, 38400, 57600, 115200]
+
+    def __init__(self, port, baudrate, timeout, channels=1, channel_list=False):
+        # channel_list: the instrument accepts SCPI channel lists, e.g. MEAS:VOLT? (@1,2,3)
+        self.channels = channels
+        self.channel_list = channel_list
         try:
             self.ser = serial.Serial(
                 port=port,
@@ -14,6 +25,7 @@ class PowerSupply:
                 stopbits=serial.STOPBITS_ONE,
                 timeout=timeout
             )
+            self.ser = capture_serial(self.ser, 'PSU')
         except serial.SerialException as e:
             raise RuntimeError(f'Failed to connect to power supply: {e}')
 
@@ -25,21 +37,52 @@ class PowerSupply:
         return None
 
     def set_voltage(self, voltage, channel=1):
-        self.send_command(f'INST:NSEL {channel}')
-        self.send_command(f'VOLT {voltage}')
+        # Channel selection and setpoint in one exchange
+        self.send_command(f'INST:NSEL {channel};:VOLT {voltage}')
 
     def get_voltage(self, channel=1):
         self.send_command(f'INST:NSEL {channel}')
         return float(self.send_command('MEAS:VOLT?'))
 
     def set_current(self, current, channel=1):
-        self.send_command(f'INST:NSEL {channel}')
-        self.send_command(f'CURR {current}')
+        self.send_command(f'INST:NSEL {channel};:CURR {current}')
 
     def get_current(self, channel=1):
         self.send_command(f'INST:NSEL {channel}')
         return float(self.send_command('MEAS:CURR?'))
 
+    def get_reading(self, channel=1):
+        # Select the channel and query voltage and current in one exchange, replies come back as '<volt>;<curr>'
+        voltage, current = self.send_command(f'INST:NSEL {channel};:MEAS:VOLT?;:MEAS:CURR?').split(';')
+        return PowerSupplyReading(voltage=float(voltage), current=float(current))
+
+    def get_all_readings(self):
+        '''Readings of every channel from a single exchange'''
+        channels = range(1, self.channels + 1)
+        if self.channel_list:
+            # Replies come back as '<v1>,<v2>,...;<c1>,<c2>,...'
+            channel_list = f'(@{",".join(str(channel) for channel in channels)})'
+            voltages, currents = self.send_command(f'MEAS:VOLT? {channel_list};:MEAS:CURR? {channel_list}').split(';')
+            return tuple(
+                PowerSupplyReading(voltage=float(voltage), current=float(current))
+                for voltage, current in zip(voltages.split(','), currents.split(','))
+            )
+
+        # Otherwise chain channel selection and queries in one line, replies come back as '<v1>;<c1>;<v2>;<c2>;...'
+        command = ';:'.join(f'INST:NSEL {channel};:MEAS:VOLT?;:MEAS:CURR?' for channel in channels)
+        values = [float(value) for value in self.send_command(command).split(';')]
+        return tuple(
+            PowerSupplyReading(voltage=values[index], current=values[index + 1])
+            for index in range(0, len(values), 2)
+        )
+
+    def probe(self):
+        '''True if the PSU answers sensibly at the current baud rate'''
+        return ',' in self.identify()
+
+    def baudrate_command(self, baudrate):
+        return f'SYST:COMM:SER:BAUD {baudrate}'
+
     def start(self):
         self.send_command('OUTP ON')
 
@@ -53,6 +96,13 @@ class PowerSupply:
     def identify(self):
         return self.send_command('*IDN?')
 
+    def self_test(self):
+        '''Identity query for the pre-flight check, raises if the PSU does not answer sensibly'''
+        identity = self.identify()
+        if ',' not in identity:
+            raise RuntimeError(f'Unexpected identity reply {identity!r}')
+        return identity
+
     def close(self):
         self.ser.close()
 
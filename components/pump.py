@@ -1,8 +1,22 @@
 import serial
 import time
+from collections import namedtuple
+
+from components.capture import capture_serial
+
+PumpReading = namedtuple('PumpReading', ['speed', 'running'])
 
 class Pump:
+    # Set on the pump keypad only, so the rate can be detected but not changed remotely
+    BAUDRATES = [2400, 4800, 9600, 19200]
+
+    # Running state follows our own start/stop commands and is only queried every this many readings,
+    # to notice a stop from the keypad, so most polls are a single exchange
+    STATUS_EVERY = 10
+
     def __init__(self, port, baudrate, timeout):
+        self.running = None
+        self.readings = 0
         try:
             self.ser = serial.Serial(
                 port=port,
@@ -12,6 +26,7 @@ class Pump:
                 stopbits=serial.STOPBITS_TWO,
                 timeout=timeout
             )
+            self.ser = capture_serial(self.ser, 'Pump')
         except serial.SerialException as e:
             raise RuntimeError(f'Failed to connect to pump: {e}')
 
@@ -31,16 +46,43 @@ class Pump:
 
     def start(self):
         self.send_command('1GO')
+        self.running = True
 
     def stop(self):
         self.send_command('1ST')
+        self.running = False
 
     def get_info(self):
         return self.send_command('1RS')
 
     def get_status(self):
         status = self.send_command('1ZY')
-        return bool(int(status)) if status else False
+        if status not in ('0', '1'):
+            raise RuntimeError(f'Unexpected status reply {status!r}')
+        self.running = status == '1'
+        return self.running
+
+    def self_test(self):
+        '''Status query for the pre-flight check, raises if the pump does not answer sensibly'''
+        return 'running' if self.get_status() else 'stopped'
+
+    def probe(self):
+        '''True if the pump answers with its speed at the current baud rate'''
+        try:
+            float(self.get_info())
+            return True
+        except ValueError:
+            return False
+
+    def baudrate_command(self, baudrate):
+        return None
+
+    def get_reading(self):
+        speed = float(self.get_info())
+        if self.running is None or self.readings % Pump.STATUS_EVERY == 0:
+            self.get_status()
+        self.readings += 1
+        return PumpReading(speed=speed, running=self.running)
 
     def close(self):
         self.ser.close()
@@ -1,7 +1,15 @@
 import serial
 import time
+from collections import namedtuple
+
+from components.capture import capture_serial
+
+StirrerReading = namedtuple('StirrerReading', ['speed', 'set_speed'])
 
 class Stirrer:
+    # The serial interface runs at a fixed rate
+    BAUDRATES = [9600]
+
     def __init__(self, port, baudrate, timeout):
         try:
             self.ser = serial.Serial(
@@ -12,6 +20,7 @@ class Stirrer:
                 stopbits=serial.STOPBITS_ONE,
                 timeout=timeout
             )
+            self.ser = capture_serial(self.ser, 'Stirrer')
         except serial.SerialException as e:
             raise RuntimeError(f'Failed to connect to stirrer: {e}')
 
@@ -34,6 +43,27 @@ class Stirrer:
     def get_set_speed(self):
         return self.send_command('IN_SP_4')
 
+    def get_reading(self):
+        # Replies are '<value> <channel>', e.g. '800.0 4'
+        speed = self.get_speed().split()[0]
+        set_speed = self.get_set_speed().split()[0]
+        return StirrerReading(speed=float(speed), set_speed=float(set_speed))
+
+    def probe(self):
+        '''True if the stirrer answers with its speed at the current baud rate'''
+        return self.get_speed().endswith(' 4')
+
+    def baudrate_command(self, baudrate):
+        return None
+
+    def self_test(self):
+        '''Speed query for the pre-flight check, raises if the stirrer does not answer sensibly'''
+        reply = self.get_speed()
+        try:
+            return f'{float(reply.split()[0]):.0f} rpm'
+        except (IndexError, ValueError):
+            raise RuntimeError(f'Unexpected speed reply {reply!r}')
+
     def start(self):
         return self.send_command('START_4')
 
@@ -0,0 +1,15 @@
+# Parsed experiment logs are cached here, keyed by file name, size and modification time
+ANALYSIS_CACHE_DIRECTORY = 'output/.cache'
+
+# Peristaltic pump delivery per revolution scales with the tubing bore squared.
+# mL/rev = PUMP_ML_PER_REV_PER_MM2 * bore^2, calibrate against a timed volume for the pumphead in use.
+PUMP_ML_PER_REV_PER_MM2 = 0.016
+
+# Runs exported to Parquet/HDF5 are written here, converting EXPORT_CHUNK_ROWS rows at a time
+EXPORT_DIRECTORY = 'output/export'
+EXPORT_CHUNK_ROWS = 50000
+
+# History viewer: runs are converted HISTORY_CHUNK_ROWS rows at a time into memory-mapped channel files
+# in ANALYSIS_CACHE_DIRECTORY, and no view draws more than HISTORY_POINTS points, full resolution or not
+HISTORY_CHUNK_ROWS = 100000
+HISTORY_POINTS = 2000
@@ -0,0 +1,19 @@
+# Online drift detection on the sample stream. Per channel, a reference mean and standard deviation are
+# learnt over ANOMALY_WARMUP_SAMPLES samples, skipping the first ANOMALY_SKIP_SAMPLES after every start or
+# setpoint change. Every sample after that updates an EWMA chart and a two-sided CUSUM of the deviation.
+ANOMALY_DETECTION = True
+ANOMALY_CHANNELS = ['Voltage', 'Current', 'Pump speed', 'Pressure', 'Temperature', 'Flow rate', 'Stirrer speed']
+ANOMALY_SKIP_SAMPLES = 3
+ANOMALY_WARMUP_SAMPLES = 30
+
+# EWMA chart: weight of the newest sample, alarm beyond ANOMALY_EWMA_LIMIT standard deviations of the EWMA
+ANOMALY_EWMA_WEIGHT = 0.1
+ANOMALY_EWMA_LIMIT = 3
+
+# CUSUM: drift allowed per sample and alarm threshold, both in reference standard deviations
+ANOMALY_CUSUM_SLACK = 0.5
+ANOMALY_CUSUM_THRESHOLD = 5
+
+# Noise-free channels (a steady pump speed) would flag any change at all, so the reference standard
+# deviation is at least this fraction of the reference mean
+ANOMALY_MIN_STD_FRACTION = 0.01
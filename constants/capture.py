@@ -0,0 +1,10 @@
+# Raw serial traffic capture of every device, kept in memory and dumped to CAPTURE_DIRECTORY on error or on demand
+CAPTURE_ENABLED = False
+CAPTURE_DIRECTORY = 'output/captures'
+
+# Ring buffer of fixed-size records, oldest are overwritten first
+CAPTURE_RECORDS = 16384
+CAPTURE_RECORD_SIZE = 128
+
+# At most one dump per interval when errors repeat every cycle
+CAPTURE_DUMP_INTERVAL = 60
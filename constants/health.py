@@ -0,0 +1,16 @@
+# Circuit breaker of each device: after DEVICE_FAILURES_TO_DEGRADE failed or late reads in a row the device
+# is marked degraded and left out of the sample cycle, then probed in the background until it answers again
+DEVICE_FAILURES_TO_DEGRADE = 3
+DEVICE_PROBE_INTERVAL = 30
+
+# Longest the pre-flight check waits for the background device connection started with the GUI
+DEVICE_CONNECT_TIMEOUT = 30
+
+# Longest the sample cycle waits for the devices to answer, all devices are read in parallel
+DEVICE_READ_TIMEOUT = 3
+
+# Devices that must pass the pre-flight check before a run starts (the stirrer is not connected yet),
+# and the longest the check waits for all of them together: one deadline shared by every device,
+# so the results are in within about a second however many devices are slow
+PREFLIGHT_DEVICES = ['psu', 'pump', 'mfc']
+PREFLIGHT_TIMEOUT = 1
@@ -0,0 +1,7 @@
+# Safety rules used when the selected save has no 'interlocks' list of its own.
+# Channels are <device>.<field> of the device readings, actions are 'shutdown' or 'stop_<device>', e.g.
+#   {'type': 'threshold', 'channel': 'psu.current', 'max': 2.0, 'action': 'shutdown'}
+#   {'type': 'threshold', 'channel': 'mfc.mass_flow', 'min': 5.0, 'action': 'stop_psu'}
+#   {'type': 'rate', 'channel': 'psu.voltage', 'max_rate': 0.5, 'action': 'shutdown'}
+#   {'type': 'not_responding', 'device': 'pump', 'samples': 3, 'action': 'shutdown'}
+DEFAULT_INTERLOCK_RULES = []
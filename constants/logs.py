@@ -0,0 +1,19 @@
+# Application log (not the experiment log): console and a rotating file, both written by a background thread
+APP_LOG_FILE = 'output/logs/r3v.log'
+APP_LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+APP_LOG_FILE_BACKUPS = 5
+
+# Lowest level each destination writes
+APP_LOG_CONSOLE_LEVEL = 'INFO'
+APP_LOG_FILE_LEVEL = 'DEBUG'
+APP_LOG_WINDOW_LEVEL = 'INFO'
+
+# Lowest level recorded by each subsystem, the package of the module logging (or 'gui' for main.py).
+# Records below it are dropped before they are queued.
+APP_LOG_LEVELS = {
+    'components': 'INFO',
+    'controller': 'DEBUG',
+    'storage': 'INFO',
+    'analysis': 'INFO',
+    'gui': 'DEBUG'
+}
@@ -4,4 +4,15 @@ TIMEOUT  = 1
 PSU_PORT  = '/dev/tty.usbserial-FT6W3K240'
 PUMP_PORT = '/dev/tty.usbserial-FT6W3K241'
 MFC_PORT = '/dev/tty.usbserial-FT6W3K242'
-STIRRER_PORT = '/dev/tty.usbserial-FT6W3K243'
\ No newline at end of file
+STIRRER_PORT = '/dev/tty.usbserial-FT6W3K243'
+
+# Number of PSU output channels logged, and whether the PSU accepts SCPI channel lists (@1,2,...)
+PSU_CHANNELS = 1
+PSU_CHANNEL_LIST = False
+
+# When enabled each device is switched to the highest baud rate both it and BAUDRATE_MAX allow,
+# where the instrument can be switched remotely. The rate found for each port is remembered in BAUDRATE_FILE
+# and tried first next time, BAUDRATE is only the starting guess.
+BAUDRATE_NEGOTIATION = False
+BAUDRATE_MAX = 115200
+BAUDRATE_FILE = 'output/baudrates.json'
@@ -0,0 +1,8 @@
+# Unattended run queue, see controller/run_queue.py for the queue file format
+RUN_QUEUE_DIRECTORY = 'queues'
+
+# Settling time between runs, in seconds, when neither the queue nor the run gives one
+RUN_QUEUE_SETTLE_TIME = 0
+
+# Experiment definitions a queued run can name with "save"
+SAVE_STATE_FILE = 'save_state_data.json'
@@ -0,0 +1,33 @@
+# Experiment log format: 'csv' writes one file, 'segmented' rolls over to compressed chunks,
+# 'sqlite' inserts samples into SQLITE_DB_NAME
+LOG_MODE = 'csv'
+
+# Segmented log rolls over to a new chunk when either limit is reached
+SEGMENT_MAX_SECONDS = 6 * 60 * 60
+SEGMENT_MAX_BYTES = 20 * 1024 * 1024
+
+# SQLite sample database shared by every run logged in 'sqlite' mode
+SQLITE_DB_NAME = 'output/samples.db'
+SQLITE_BATCH_SIZE = 500
+SQLITE_FLUSH_INTERVAL = 1.0
+
+# Compression of logged rows: None logs every sample, 'deadband' or 'swinging_door' only logs a row
+# once a channel leaves its tolerance. Channels without a tolerance are logged whenever they change.
+LOG_COMPRESSION = None
+COMPRESSION_TOLERANCES = {
+    'Voltage': 0.01,
+    'Current': 0.005,
+    'Pump speed': 0.5,
+    'Pressure': 0.1,
+    'Temperature': 0.1,
+    'Volumetric flow': 0.5,
+    'Flow rate': 0.5,
+    'Stirrer speed': 5
+}
+# A row is always logged when none has been for this long
+COMPRESSION_HEARTBEAT_SECONDS = 5 * 60
+
+# Summary logs of mean/std/min/max per channel over each window (seconds), written next to the raw log
+# while the run is recorded. An empty list turns them off.
+SUMMARY_WINDOWS = [60, 600]
+SUMMARY_DIRECTORY = 'output/summary'
@@ -0,0 +1,7 @@
+# Live telemetry stream of samples and run state, newline-delimited JSON over TCP
+TELEMETRY_ENABLED = False
+TELEMETRY_HOST = '127.0.0.1'
+TELEMETRY_PORT = 8765
+
+# Messages held per subscriber, the oldest are dropped when a client cannot keep up
+TELEMETRY_QUEUE_SIZE = 256
@@ -0,0 +1,110 @@
+import math
+import logging
+
+from controller.sample import Event
+from controller.summary import RunningStats
+from constants.anomaly import (
+    ANOMALY_CHANNELS, ANOMALY_SKIP_SAMPLES, ANOMALY_WARMUP_SAMPLES, ANOMALY_EWMA_WEIGHT, ANOMALY_EWMA_LIMIT,
+    ANOMALY_CUSUM_SLACK, ANOMALY_CUSUM_THRESHOLD, ANOMALY_MIN_STD_FRACTION
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelDetector:
+    '''
+    Drift detector of one channel, constant time per sample.
+
+    After skipping the first skip samples (start-up transients) it learns a reference mean and standard
+    deviation over warmup samples. Every later sample is standardised against that reference and feeds
+    an EWMA chart, which catches a shift of the level, and a two-sided CUSUM, which catches a small
+    steady drift sooner. After an alarm the reference is learnt again, so a drift that carries on is
+    flagged again at each further step rather than on every sample.
+    '''
+    __slots__ = ('skip', 'warmup', 'reference', 'mean', 'std', 'ewma', 'ewma_limit', 'upper', 'lower', 'skipped')
+
+    def __init__(self, skip=ANOMALY_SKIP_SAMPLES, warmup=ANOMALY_WARMUP_SAMPLES):
+        self.skip = skip
+        self.warmup = warmup
+        self.reference = RunningStats()
+        # Standard deviations of the EWMA of standardised samples, once it has settled
+        self.ewma_limit = ANOMALY_EWMA_LIMIT * math.sqrt(ANOMALY_EWMA_WEIGHT / (2 - ANOMALY_EWMA_WEIGHT))
+        self.reset()
+
+    def reset(self):
+        self.reference.reset()
+        self.mean = None
+        self.std = None
+        self.ewma = 0.0
+        self.upper = 0.0
+        self.lower = 0.0
+        self.skipped = 0
+
+    def update(self, value):
+        '''Returns a description of the anomaly when value completes one, None otherwise'''
+        if self.skipped < self.skip:
+            self.skipped += 1
+            return None
+
+        if self.mean is None:
+            self.reference.add(value)
+            if self.reference.count == self.warmup:
+                self.mean = self.reference.mean
+                self.std = max(self.reference.std, abs(self.mean) * ANOMALY_MIN_STD_FRACTION, 1e-9)
+            return None
+
+        z = (value - self.mean) / self.std
+        self.ewma += ANOMALY_EWMA_WEIGHT * (z - self.ewma)
+        self.upper = max(0.0, self.upper + z - ANOMALY_CUSUM_SLACK)
+        self.lower = max(0.0, self.lower - z - ANOMALY_CUSUM_SLACK)
+
+        if abs(self.ewma) > self.ewma_limit:
+            detail = f'EWMA {"rising" if self.ewma > 0 else "falling"} from {self.mean:.4g} (now {self.mean + self.ewma * self.std:.4g})'
+        elif self.upper > ANOMALY_CUSUM_THRESHOLD or self.lower > ANOMALY_CUSUM_THRESHOLD:
+            detail = f'CUSUM {"rising" if self.upper > self.lower else "falling"} from {self.mean:.4g} (now {value:.4g})'
+        else:
+            return None
+
+        # Learn the new level straight away, there is no transient to skip
+        self.reset()
+        self.skipped = self.skip
+        return detail
+
+
+class AnomalyDetector:
+    '''
+    SamplePipeline consumer running a ChannelDetector on each of channels, flagging anomalies as
+    events through on_anomaly (App.log_event puts them in the run log and the GUI).
+
+    The work per sample is a few arithmetic operations per channel on the acquisition thread, after
+    the interlocks have been checked. Detectors start learning again whenever the devices are started
+    and after a setpoint change, so expected steps are not flagged.
+    '''
+    def __init__(self, data_header, on_anomaly, channels=ANOMALY_CHANNELS):
+        self.on_anomaly = on_anomaly
+        columns = data_header[1:]
+        self.channels = [(columns.index(channel), channel) for channel in channels if channel in columns]
+        self.detectors = {channel: ChannelDetector() for _, channel in self.channels}
+
+    def reset(self):
+        for detector in self.detectors.values():
+            detector.reset()
+
+    def on_sample(self, sample):
+        cells = sample.to_row()[1:]
+        for index, channel in self.channels:
+            value = cells[index]
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            detail = self.detectors[channel].update(value)
+            if detail:
+                logger.warning(f'Anomaly on {channel}: {detail}')
+                self.on_anomaly(Event(sample.time, 'Anomaly', channel, value, detail=detail))
+
+    def on_state(self, state, details):
+        if state in ('ready', 'running', 'replay'):
+            self.reset()
+
+    def on_event(self, event):
+        if event.kind == 'Setpoint':
+            self.reset()
@@ -1,12 +1,41 @@
 import threading
 import time
 import logging
+from datetime import datetime
 from components.powerSupply import PowerSupply
 from components.pump import Pump
 from components.mfc import MassFlowController
 from components.stirrer import Stirrer
+from components.capture import dump_capture
+from components.baudrate import remembered_baudrate, negotiate_baudrate
+from components.command_queue import QueuedDevice, ESTOP, STOP, COMMAND_TIMEOUT
+from controller.sample import Sample, Event
+from controller.interlocks import InterlockEngine
+from controller.health import DeviceHealth, PreflightResult
 
-from constants.ports import PSU_PORT, PUMP_PORT, MFC_PORT, STIRRER_PORT, BAUDRATE,  TIMEOUT
+from constants.ports import PSU_PORT, PUMP_PORT, MFC_PORT, STIRRER_PORT, BAUDRATE,  TIMEOUT, PSU_CHANNELS, PSU_CHANNEL_LIST, BAUDRATE_NEGOTIATION
+from constants.health import DEVICE_READ_TIMEOUT, DEVICE_CONNECT_TIMEOUT, PREFLIGHT_DEVICES, PREFLIGHT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Longest time a device thread waits for the others before a synchronized start is abandoned
+SYNC_START_TIMEOUT = 5
+
+# Setpoints that can be changed while the experiment runs: device and unit, named as in the log header
+SETPOINTS = {
+    'Voltage': ('psu', None),
+    'Pump speed': ('pump', 'rpm'),
+    'Pump direction': ('pump', ''),
+    'Flow rate': ('mfc', 'sccm'),
+    'Stirrer speed': ('stirrer', 'rpm')
+}
+
+
+def duration_seconds(value, unit):
+    '''Duration in seconds of a value in 'minutes' or 'hours', None when there is no value'''
+    if value is None:
+        return None
+    return value * 3600 if unit == 'hours' else value * 60
 
 class Controller():
     def __init__(self, parent):
@@ -20,201 +49,430 @@ class Controller():
         self.should_stop = False
         self.should_reset = False
 
+        # Send start commands to all devices at the same instant
+        self.synchronized_start = True
+        self.devices_running = False
+        self.setup_started_time = None
+        # When Start was last pressed, start-up latency is measured from here rather than from setup
+        self.start_pressed_time = None
+        # When the devices were first started in this run, the duration is counted from here
+        self.run_started_time = None
+        self.interlocks = InterlockEngine()
+        # PSU setpoint mode of the current experiment, used for live changes
+        self.psu_config = {'mode': 'V'}
+
         self.psu = None
         self.pump = None
         self.mfc = None
-        # self.stirrer = None
-        
-
-        try:
-            self.connect_devices()
-        except Exception as e:
-            logging.error(f'Controller could not connect to devices. Error: {e}')
-            return
-
-    def connect_devices(self):
-        '''Test connection to devices'''
-        print(BAUDRATE, TIMEOUT)
-
-        self.psu = PowerSupply(port=PSU_PORT, baudrate=BAUDRATE, timeout=TIMEOUT)
-        self.pump = Pump(port=PUMP_PORT, baudrate=BAUDRATE, timeout=TIMEOUT)
-        self.mfc = MassFlowController(port=MFC_PORT, baudrate=BAUDRATE, timeout=TIMEOUT)
-        # self.stirrer = Stirrer(port=STIRRER_PORT, baudrate=BAUDRATE, timeout=TIMEOUT)
-
-        logging.info(f'Connected to components!')
-
-    def run(self, psu_config, pump_config, mfc_config, stirrer_config, duration_config):
+        self.stirrer = None
+        # Circuit breaker of each connected device, keyed by attribute name
+        self.health = {}
+        # Set once connect_devices has tried every device, connected or not
+        self.connected = threading.Event()
+
+    def connect_devices(self, on_state=None):
+        '''
+        Open every device at the same time, each in its own thread, so a slow or missing device does not
+        hold up the others. Runs in the background while the GUI is already up. on_state(key, state) is
+        called with 'connecting', then 'connected' or 'failed', for each device.
+        '''
+        logger.debug(f'Connecting to devices, {BAUDRATE} baud unless negotiated, {TIMEOUT} s timeout')
+
+        # Every device gets its own command queue, so polls, setpoints and stops never interleave on a port.
+        # Ports are opened at the rate last negotiated on them
+        devices = {
+            'psu': (lambda: PowerSupply(port=PSU_PORT, baudrate=remembered_baudrate(PSU_PORT), timeout=TIMEOUT, channels=PSU_CHANNELS, channel_list=PSU_CHANNEL_LIST), PSU_PORT, 'PSU'),
+            'pump': (lambda: Pump(port=PUMP_PORT, baudrate=remembered_baudrate(PUMP_PORT), timeout=TIMEOUT), PUMP_PORT, 'Pump'),
+            'mfc': (lambda: MassFlowController(port=MFC_PORT, baudrate=remembered_baudrate(MFC_PORT), timeout=TIMEOUT), MFC_PORT, 'MFC'),
+            # 'stirrer': (lambda: Stirrer(port=STIRRER_PORT, baudrate=remembered_baudrate(STIRRER_PORT), timeout=TIMEOUT), STIRRER_PORT, 'Stirrer')
+        }
+
+        def connect(key, driver, port, name):
+            try:
+                setattr(self, key, self.open_device(driver(), port, name))
+            except Exception as e:
+                logger.error(f'Could not connect to {name}. Error: {e}')
+                if on_state:
+                    on_state(key, 'failed')
+                return
+            if on_state:
+                on_state(key, 'connected')
+
+        start_time = time.perf_counter()
+        threads = []
+        for key, (driver, port, name) in devices.items():
+            if on_state:
+                on_state(key, 'connecting')
+            threads.append(threading.Thread(target=connect, args=(key, driver, port, name), name=f'{name} connect', daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for key in ('psu', 'pump', 'mfc', 'stirrer'):
+            device = getattr(self, key)
+            if device:
+                read_method = 'get_all_readings' if key == 'psu' and PSU_CHANNELS > 1 else 'get_reading'
+                self.health[key] = DeviceHealth(key, device, read_method, on_change=self.device_health_changed)
+
+        connected = [key for key in devices if getattr(self, key)]
+        logger.info(f'Connected to {len(connected)} of {len(devices)} components in {time.perf_counter() - start_time:.2f} s')
+        self.connected.set()
+
+    def open_device(self, driver, port, name):
+        if BAUDRATE_NEGOTIATION:
+            negotiate_baudrate(driver, port, name)
+        return QueuedDevice(driver, name)
+
+    def preflight_check(self):
+        '''
+        Run every device's self-test at the same time and time each round trip. Returns a
+        PreflightResult per device in PREFLIGHT_DEVICES, one that is not connected, raises or does not
+        answer within PREFLIGHT_TIMEOUT has failed.
+        '''
+        # Devices may still be connecting when the first experiment is set up
+        if not self.connected.wait(DEVICE_CONNECT_TIMEOUT):
+            logger.warning(f'Devices still connecting after {DEVICE_CONNECT_TIMEOUT} s, checking those connected so far')
+
+        start_time = time.perf_counter()
+        deadline = start_time + PREFLIGHT_TIMEOUT
+        answered = {}
+        futures = {}
+        for key in PREFLIGHT_DEVICES:
+            device = getattr(self, key)
+            if device:
+                futures[key] = device.submit('self_test')
+                # Called on the device's command thread as soon as it answers
+                futures[key].add_done_callback(lambda _, key=key: answered.setdefault(key, time.perf_counter()))
+
+        results = {}
+        for key in PREFLIGHT_DEVICES:
+            future = futures.get(key)
+            if future is None:
+                results[key] = PreflightResult(key, False, None, 'not connected')
+                continue
+            try:
+                detail = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                results[key] = PreflightResult(key, True, answered[key] - start_time, str(detail))
+            except Exception as e:
+                latency = answered[key] - start_time if key in answered else None
+                results[key] = PreflightResult(key, False, latency, str(e) or f'no answer within {PREFLIGHT_TIMEOUT} s')
+
+        for result in results.values():
+            latency = f'{result.latency * 1000:.0f} ms' if result.latency is not None else '-'
+            if result.passed:
+                logger.info(f'Pre-flight {result.device}: ok in {latency} ({result.detail})')
+            else:
+                logger.error(f'Pre-flight {result.device}: FAILED after {latency} ({result.detail})')
+        return results
+
+    def run(self, psu_config, pump_config, mfc_config, stirrer_config, duration_config, interlock_config=None):
+        self.interlocks = InterlockEngine(interlock_config)
+        self.psu_config = psu_config
+        self.setup_started_time = time.perf_counter()
         try:
             self.setup_devices(psu_config, pump_config, mfc_config, stirrer_config)
         except Exception as e:
-            logging.error(f'Controller could not setup devices. Error: {e}')
+            logger.error(f'Controller could not setup devices. Error: {e}')
+            # Nothing is running, so the experiment can only be reset
+            self.parent.reset_complete()
             return
 
-        logging.info('Controller ready!')
+        logger.info(f'Controller ready! Devices set up in {time.perf_counter() - self.setup_started_time:.3f} s')
         self.should_reset = False
+        self.run_started_time = None
 
-
-        cut_off_time = duration_config['time'] * 60 if duration_config['unit'] != 'minutes' else duration_config['time']
-        print(cut_off_time)
+        # No duration means the experiment runs until it is stopped
+        cut_off_time = duration_seconds(duration_config['time'], duration_config['unit'])
+        logger.debug(f'Experiment cut-off after {cut_off_time} s' if cut_off_time is not None else 'Experiment has no cut-off')
 
         # Run so long as not reset
         while not self.should_reset:
             # Disable devices remotely if stopped
-            if self.should_stop:
+            if self.should_stop and self.devices_running:
                 self.shutdown_devices()
 
             # Log parameters if started
             if self.should_run:
-                self.startup_devices()
+                if not self.devices_running:
+                    self.startup_devices()
+                    self.run_started_time = self.run_started_time or time.perf_counter()
                 self.log_devices()
 
+            # Wall-clock duration from the first start, a stop in between does not extend it
+            if cut_off_time is not None and self.run_started_time and not self.should_stop \
+                    and time.perf_counter() - self.run_started_time >= cut_off_time:
+                logger.info(f'Experiment finished after {cut_off_time / 60:g} min')
+                self.stop()
+                if self.devices_running:
+                    self.shutdown_devices()
+                self.parent.experiment_finished()
+
             time.sleep(10)
 
-        logging.info('Controller has been reset. Ready for new experiment!')
+        logger.info('Controller has been reset. Ready for new experiment!')
         self.parent.reset_complete()
 
-    def setup_devices(self, psu_config, pump_config, mfc_config, stirrer_config):
-        # PSU
-        mode = psu_config['mode']
-        value = psu_config['value']
+    def run_on_devices(self, actions, synchronized=False):
+        '''
+        Run one action per device, each in its own thread so the command sleeps overlap.
+        When synchronized, every thread waits at a barrier and the commands are released together.
+        Returns the time each successful action finished, keyed by device name.
+        '''
+        barrier = threading.Barrier(len(actions)) if synchronized and actions else None
+        finished = {}
 
-        if mode == 'V':
+        def run_action(name, action):
             try:
-                if self.psu:
-                    self.psu.set_voltage(voltage=value)
-            except:
-                pass
-        else:
-            current = value / 1000 if mode == 'mA' else value
+                if barrier:
+                    barrier.wait(timeout=SYNC_START_TIMEOUT)
+                action()
+                finished[name] = time.perf_counter()
+            except Exception as e:
+                logger.error(f'Command to {name} failed. Error: {e}')
+                dump_capture(f'Command to {name} failed: {e}', on_error=True)
+
+        threads = [threading.Thread(target=run_action, args=(name, action), daemon=True) for name, action in actions.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return finished
 
-            try:
-                if self.psu:
-                    self.psu.set_current(current=current)
-            except:
-                pass
+    def setup_devices(self, psu_config, pump_config, mfc_config, stirrer_config):
+        actions = {}
+
+        # PSU, channels without their own setpoint follow channel 1
+        if self.psu:
+            channel_configs = [psu_config] + list(psu_config.get('channels', []))
+            channel_configs += [psu_config] * (PSU_CHANNELS - len(channel_configs))
+
+            def setup_psu():
+                for channel, config in enumerate(channel_configs[:PSU_CHANNELS], start=1):
+                    mode = config.get('mode', psu_config['mode'])
+                    value = config['value']
+
+                    if mode == 'V':
+                        self.psu.set_voltage(voltage=value, channel=channel)
+                    else:
+                        current = value / 1000 if mode == 'mA' else value
+                        self.psu.set_current(current=current, channel=channel)
+            actions['PSU'] = setup_psu
 
         # Pump
-        try:
-            if self.pump:
+        if self.pump:
+            def setup_pump():
                 self.pump.set_direction(clockwise=pump_config['direction'] == 'Clockwise')
                 self.pump.set_speed(rpm=pump_config['speed'])
-        except:
-            pass
+            actions['Pump'] = setup_pump
 
         # MFC
-        try:
-            if self.mfc:
-                self.mfc.set_flow_rate(flow_rate=mfc_config['flow'])
-        except:
-            pass
+        if self.mfc:
+            actions['MFC'] = lambda: self.mfc.set_flow_rate(flow_rate=mfc_config['flow'])
 
-        # # Stirrer
-        # try:
-        #     if self.stirrer:
-        #         self.stirrer.set_speed(rpm=stirrer_config['speed'])
+        # Stirrer
+        if self.stirrer:
+            actions['Stirrer'] = lambda: self.stirrer.set_speed(rpm=stirrer_config['speed'])
 
+        self.run_on_devices(actions)
 
-    def shutdown_devices(self):
-        print('Shutdown devices')
-        try:
-            if self.psu:
-                self.psu.stop()
-        except:
-            pass
+    def shutdown_devices(self, priority=STOP):
+        '''Stop every device in parallel, each stop going ahead of anything queued on that device'''
+        logger.info('Shutting down devices')
+        self.devices_running = False
 
-        try:
-            if self.pump:
-                self.pump.stop()
-        except:
-            pass
+        start_time = time.perf_counter()
+        futures = {
+            device.name: device.submit('stop', priority=priority)
+            for device in (self.psu, self.pump, self.mfc, self.stirrer) if device
+        }
 
-        try:
-            if self.mfc:
-                self.mfc.stop()
-        except:
-            pass
-
-        # try:
-        #     if self.stirrer:
-        #         self.stirrer.stop()
-        # except:
-        #     pass
+        stopped = []
+        for name, future in futures.items():
+            try:
+                future.result(timeout=COMMAND_TIMEOUT)
+                stopped.append(name)
+            except Exception as e:
+                # A timed out future has no message of its own
+                error = str(e) or f'{type(e).__name__}, no answer within {COMMAND_TIMEOUT} s'
+                logger.error(f'Could not stop {name}. Error: {error}')
+                dump_capture(f'Stopping {name} failed: {error}', on_error=True)
+
+        if futures:
+            logger.info(f'Outputs off {(time.perf_counter() - start_time) * 1000:.0f} ms after stop ({", ".join(stopped) or "no devices"} stopped)')
+
+    def emergency_stop(self):
+        '''Stop the experiment and turn every output off now, ahead of any queued command'''
+        logger.warning('Emergency stop!')
+        # Any device that does not stop in time is named by shutdown_devices
+        self.stop()
+        self.shutdown_devices(priority=ESTOP)
 
     def startup_devices(self):
-        try:
-            if self.psu:
-                self.psu.start()
-        except:
-            pass
-
-        try:
-            if self.pump:
-                self.pump.start()
-        except:
-            pass
-
-        try:
-            if self.mfc:
-                self.mfc.start()
-        except:
-            pass
-
-        # try:
-        #     if self.stirrer:
-        #         self.stirrer.start()
-        # except:
-        #     pass
+        actions = {}
+        if self.psu:
+            actions['PSU'] = self.psu.start
+        if self.pump:
+            actions['Pump'] = self.pump.start
+        if self.mfc:
+            actions['MFC'] = self.mfc.start
+        if self.stirrer:
+            actions['Stirrer'] = self.stirrer.start
+
+        # Taken just before the device threads are released
+        start_time = time.perf_counter()
+        finished = self.run_on_devices(actions, synchronized=self.synchronized_start)
+        self.devices_running = True
+
+        if finished:
+            all_running = max(finished.values())
+            window = all_running - min(finished.values())
+            pressed = self.start_pressed_time or start_time
+            logger.info(
+                f'All devices running {all_running - start_time:.3f} s after the start commands were released '
+                f'({all_running - pressed:.3f} s after Start was pressed), '
+                f'outputs turned on within {window * 1000:.1f} ms'
+            )
 
     def log_devices(self):
-        # Get current readings
-        try:
-            if self.psu:
-                print(f'Current: {self.psu.get_current()}')
-                print(f'Voltage: {self.psu.get_voltage()}')
-        except:
-            pass
+        # Take one snapshot per device, a device that fails to answer or is degraded is logged as empty
+        readings = self.read_devices()
+        psu_readings = self.psu_channel_readings(readings.get('psu'))
+        sample = Sample(
+            time=datetime.now(),
+            psu=psu_readings[0],
+            pump=readings.get('pump'),
+            mfc=readings.get('mfc'),
+            stirrer=readings.get('stirrer'),
+            psu_channels=psu_readings[1:]
+        )
+        # Safety rules go first so a trip is never delayed by writing to disk
+        self.check_interlocks(sample, received_time=time.perf_counter())
+
+        logger.debug(f'Logging data! {sample}')
+        self.parent.log_experiment_data(sample)
+
+    def check_interlocks(self, sample, received_time):
+        for trip in self.interlocks.evaluate(sample):
+            if trip.action == 'shutdown':
+                self.emergency_stop()
+            else:
+                device = getattr(self, trip.action.removeprefix('stop_'))
+                try:
+                    if device:
+                        device.stop()
+                except Exception as e:
+                    logger.error(f'Interlock could not stop {device.name}. Error: {e}')
+
+            latency = time.perf_counter() - received_time
+            logger.error(f'Interlock tripped: {trip.message} ({trip.rule}). {trip.action} done {latency * 1000:.1f} ms after the reading.')
+            self.parent.interlock_tripped(trip)
+
+    def read_devices(self):
+        '''
+        Read every healthy device in parallel, each on its own command queue. The cycle waits at most
+        DEVICE_READ_TIMEOUT for all of them, so a slow device only costs its own reading.
+        '''
+        deadline = time.perf_counter() + DEVICE_READ_TIMEOUT
+        futures = {key: health.submit_read() for key, health in self.health.items()}
+
+        readings = {}
+        for key, future in futures.items():
+            if future is None:
+                continue
+            health = self.health[key]
+            try:
+                readings[key] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                health.record_success()
+            except Exception as e:
+                reason = str(e) or f'no answer within {DEVICE_READ_TIMEOUT} s'
+                logger.warning(f'Could not read {health.name}. Error: {reason}')
+                dump_capture(f'{health.name} read failed: {reason}', on_error=True)
+                health.record_failure(reason)
+        return readings
+
+    def psu_channel_readings(self, reading):
+        '''Reading of every PSU channel, the PSU answers with all of them in one exchange when there is more than one'''
+        if PSU_CHANNELS == 1:
+            return (reading,)
+        readings = tuple(reading or ())[:PSU_CHANNELS]
+        return readings + (None,) * (PSU_CHANNELS - len(readings))
+
+    def change_setpoint(self, setpoint, value, channel=1):
+        '''
+        Change one of SETPOINTS while the experiment runs. The command goes straight to that device,
+        ahead of any queued poll, and is logged as an event once the device has taken it.
+        Voltage follows the experiment's PSU mode (V, A or mA), Pump direction is 'Clockwise' or 'Counter-clockwise'.
+        '''
+        if setpoint not in SETPOINTS:
+            raise ValueError(f'Unknown setpoint "{setpoint}"')
+        key, unit = SETPOINTS[setpoint]
+        device = getattr(self, key)
+        if not device:
+            raise RuntimeError(f'{setpoint} cannot be changed, {key} not connected')
+
+        name = setpoint
+        if setpoint == 'Voltage':
+            mode = self.psu_config['mode']
+            if mode == 'V':
+                device.set_voltage(voltage=value, channel=channel)
+            else:
+                device.set_current(current=value / 1000 if mode == 'mA' else value, channel=channel)
+            name = setpoint if channel == 1 else f'{setpoint} {channel}'
+            unit = mode
+        elif setpoint == 'Pump direction':
+            if value not in ('Clockwise', 'Counter-clockwise'):
+                raise ValueError(f'Invalid pump direction "{value}"')
+            device.set_direction(clockwise=value == 'Clockwise')
+        elif setpoint == 'Flow rate':
+            device.set_flow_rate(flow_rate=value)
+        else:
+            # Pump and stirrer speed
+            device.set_speed(rpm=value)
+
+        event = Event(datetime.now(), 'Setpoint', name, value, unit)
+        logger.info(f'{name} set to {value} {unit}'.rstrip())
+        self.parent.log_event(event)
+        return event
+
+    def purge(self, flow_rate, seconds, interrupted):
+        '''
+        Flow gas through the cell at flow_rate for seconds with every other device off, between runs.
+        Ends early when the interrupted event is set.
+        '''
+        if not self.mfc:
+            logger.warning('Purge skipped, MFC not connected')
+            return
 
+        logger.info(f'Purging at {flow_rate} sccm for {seconds:g} s')
+        self.mfc.set_flow_rate(flow_rate=flow_rate)
+        self.mfc.start()
         try:
-            if self.pump:
-                print(f'Pump Speed: {self.pump.pump_get_info()}')
-        except:
-            pass
+            interrupted.wait(seconds)
+        finally:
+            self.mfc.stop()
+        logger.info('Purge finished')
 
-        try:
-            if self.mfc:
-                print(f'Flow Rate: {self.mfc.get_flow_rate()}')
-        except:
-            pass
-
-        # try:
-        #     if self.stirrer:
-        #         print(f'Stirrer Speed: {self.stirrer.get_speed()}')
-        # except:
-        #     pass
-
-        logging.debug('Logging data!')
-        self.parent.log_experiment_data(
-            {'current': self.psu.get_current(), 'voltage': self.psu.get_voltage()}, 
-            {'pump_speed': self.pump.pump_get_info()}, 
-            {'flow_rate': self.mfc.get_flow_rate()}
-        )
-        
+    def device_health_changed(self, key, state):
+        self.parent.device_health_changed(key, state)
 
     def start(self):
+        self.start_pressed_time = time.perf_counter()
         self.should_run = True
         self.should_stop = False
 
-        logging.debug('Controller started!')
+        logger.debug('Controller started!')
 
     def stop(self):
         self.should_run = False
         self.should_stop = True
 
-        logging.debug('Controller stopped!')
+        logger.debug('Controller stopped!')
 
     def reset(self):
         self.should_run = False
         self.should_stop = False
         self.should_reset = True
 
-        logging.debug('Resetting controller!')
+        logger.debug('Resetting controller!')
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+
+from constants.health import DEVICE_FAILURES_TO_DEGRADE, DEVICE_PROBE_INTERVAL, DEVICE_READ_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'
+
+# Outcome of one device's pre-flight self-test, latency in seconds (None if it never answered)
+PreflightResult = namedtuple('PreflightResult', ['device', 'passed', 'latency', 'detail'])
+
+
+class DeviceHealth:
+    '''
+    Circuit breaker of one QueuedDevice.
+
+    The controller reports every read with record_success() or record_failure(). After
+    DEVICE_FAILURES_TO_DEGRADE failures in a row the device is degraded: submit_read() stops queuing
+    reads for it, so the cycle no longer waits on it, and a background thread retries the read every
+    DEVICE_PROBE_INTERVAL seconds until it answers, when the device is healthy again.
+    A read still running from an earlier cycle counts as a failure rather than queuing another one.
+    '''
+    def __init__(self, key, device, read_method='get_reading', on_change=None):
+        self.key = key
+        self.device = device
+        self.read_method = read_method
+        self.on_change = on_change
+
+        self.state = HEALTHY
+        self.failures = 0
+        self.pending = None
+        self.lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.device.name
+
+    def submit_read(self):
+        '''Future of a new read, or None when the device is degraded or still busy with the last one'''
+        if self.state == DEGRADED:
+            return None
+        if self.pending and not self.pending.done():
+            self.record_failure('still busy with the previous read')
+            return None
+        self.pending = self.device.submit(self.read_method)
+        return self.pending
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, reason):
+        with self.lock:
+            self.failures += 1
+            if self.state == DEGRADED or self.failures < DEVICE_FAILURES_TO_DEGRADE:
+                return
+            self.state = DEGRADED
+
+        logger.warning(f'{self.name} degraded after {self.failures} failed reads ({reason}), probing every {DEVICE_PROBE_INTERVAL} s until it answers')
+        threading.Thread(target=self.probe, name=f'{self.name} probe', daemon=True).start()
+        self.set_state(DEGRADED)
+
+    def probe(self):
+        while True:
+            time.sleep(DEVICE_PROBE_INTERVAL)
+            if self.pending and not self.pending.done():
+                continue
+            self.pending = self.device.submit(self.read_method)
+            try:
+                self.pending.result(timeout=DEVICE_READ_TIMEOUT)
+            except Exception as e:
+                logger.debug(f'{self.name} probe failed. Error: {e}')
+                continue
+
+            with self.lock:
+                self.failures = 0
+                self.state = HEALTHY
+            logger.info(f'{self.name} answering again, back in the sample cycle')
+            self.set_state(HEALTHY)
+            return
+
+    def set_state(self, state):
+        if self.on_change:
+            try:
+                self.on_change(self.key, state)
+            except Exception as e:
+                logger.error(f'Could not report {self.name} as {state}. Error: {e}')
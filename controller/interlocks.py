@@ -0,0 +1,158 @@
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Devices on a Sample, also the targets of a 'stop_<device>' action
+DEVICES = ('psu', 'pump', 'mfc', 'stirrer')
+
+Trip = namedtuple('Trip', ['rule', 'message', 'action'])
+
+
+def channel_getter(channel):
+    '''
+    Compile a 'device.field' channel (e.g. 'psu.current', 'mfc.mass_flow') into a function
+    returning (label, value) pairs from a Sample, value None when the device did not answer.
+    A 'psu' channel gives one pair per PSU channel, so every output is watched, not only the first.
+    '''
+    device, _, field = channel.partition('.')
+    if device not in DEVICES or not field:
+        raise ValueError(f'Invalid interlock channel "{channel}", expected <device>.<field>')
+
+    def field_value(reading):
+        return getattr(reading, field) if reading is not None else None
+
+    if device == 'psu':
+        def get(sample):
+            values = [(channel, field_value(sample.psu))]
+            for number, reading in enumerate(sample.psu_channels, start=2):
+                values.append((f'{channel} (channel {number})', field_value(reading)))
+            return values
+    else:
+        def get(sample):
+            return [(channel, field_value(getattr(sample, device)))]
+    return get
+
+
+class ThresholdRule:
+    '''Trips when a channel goes below min or above max'''
+    def __init__(self, channel, min=None, max=None, action='shutdown'):
+        self.name = f'{channel} outside [{min}, {max}]'
+        self.get = channel_getter(channel)
+        self.channel = channel
+        self.min = min
+        self.max = max
+        self.action = action
+
+    def check(self, sample):
+        for label, value in self.get(sample):
+            if value is None:
+                continue
+            if self.min is not None and value < self.min:
+                return f'{label} = {value} is below {self.min}'
+            if self.max is not None and value > self.max:
+                return f'{label} = {value} is above {self.max}'
+        return None
+
+
+class RateRule:
+    '''Trips when a channel changes faster than max_rate units per second between two samples'''
+    def __init__(self, channel, max_rate, action='shutdown'):
+        self.name = f'{channel} rate above {max_rate}/s'
+        self.get = channel_getter(channel)
+        self.channel = channel
+        self.max_rate = max_rate
+        self.action = action
+        # Last value and time of each label, PSU channels change independently
+        self.last = {}
+
+    def check(self, sample):
+        message = None
+        for label, value in self.get(sample):
+            if value is None:
+                continue
+
+            last = self.last.get(label)
+            self.last[label] = (value, sample.time)
+            if last is None or message:
+                continue
+
+            last_value, last_time = last
+            elapsed = (sample.time - last_time).total_seconds()
+            if elapsed <= 0:
+                continue
+            rate = (value - last_value) / elapsed
+            if abs(rate) > self.max_rate:
+                message = f'{label} changing at {rate:.3f}/s, limit {self.max_rate}/s'
+        return message
+
+
+class NotRespondingRule:
+    '''Trips when a device has not answered for the given number of consecutive samples'''
+    def __init__(self, device, samples=3, action='shutdown'):
+        if device not in DEVICES:
+            raise ValueError(f'Invalid interlock device "{device}"')
+        self.name = f'{device} not responding'
+        self.device = device
+        self.samples = samples
+        self.action = action
+        self.missed = 0
+
+    def check(self, sample):
+        if getattr(sample, self.device) is not None:
+            self.missed = 0
+            return None
+        self.missed += 1
+        if self.missed >= self.samples:
+            return f'{self.device} has not responded for {self.missed} samples'
+        return None
+
+
+RULE_TYPES = {
+    'threshold': ThresholdRule,
+    'rate': RateRule,
+    'not_responding': NotRespondingRule
+}
+
+
+class InterlockEngine:
+    '''
+    Evaluates the safety rules of an experiment against every new sample.
+
+    Rules are built once from the experiment config, a list of dicts such as
+    {'type': 'threshold', 'channel': 'psu.current', 'max': 2.0, 'action': 'shutdown'}.
+    action is 'shutdown' (every device) or 'stop_<device>'. A rule trips once and then stays
+    latched until the engine is rebuilt for the next run, so a fault does not re-fire every cycle.
+    '''
+    def __init__(self, rules_config=None):
+        self.rules = []
+        self.tripped = set()
+
+        for config in rules_config or []:
+            config = dict(config)
+            rule_type = config.pop('type', None)
+            if rule_type not in RULE_TYPES:
+                logger.error(f'Unknown interlock rule type "{rule_type}", rule ignored.')
+                continue
+            try:
+                rule = RULE_TYPES[rule_type](**config)
+            except (TypeError, ValueError) as e:
+                logger.error(f'Invalid interlock rule {config}. Error: {e}')
+                continue
+            if rule.action != 'shutdown' and rule.action.removeprefix('stop_') not in DEVICES:
+                logger.error(f'Invalid interlock action "{rule.action}", rule ignored.')
+                continue
+            self.rules.append(rule)
+
+        logger.debug(f'{len(self.rules)} interlock rule(s) armed.')
+
+    def evaluate(self, sample):
+        trips = []
+        for rule in self.rules:
+            if rule in self.tripped:
+                continue
+            message = rule.check(sample)
+            if message:
+                self.tripped.add(rule)
+                trips.append(Trip(rule=rule.name, message=message, action=rule.action))
+        return trips
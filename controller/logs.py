@@ -0,0 +1,63 @@
+import os
+import queue
+import logging
+import logging.handlers
+
+from constants.logs import (
+    APP_LOG_FILE, APP_LOG_FILE_MAX_BYTES, APP_LOG_FILE_BACKUPS,
+    APP_LOG_CONSOLE_LEVEL, APP_LOG_FILE_LEVEL, APP_LOG_LEVELS
+)
+
+LOG_FORMAT = '[%(levelname)s] %(asctime)s %(name)s - %(message)s'
+
+# Started by setup_logging
+listener = None
+
+
+def setup_logging(log_file=APP_LOG_FILE):
+    '''
+    Route every record through a queue to a listener thread that owns the console and file handlers,
+    so logging from the acquisition thread is only ever a put on a queue.
+    '''
+    global listener
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(APP_LOG_CONSOLE_LEVEL)
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt='%H:%M:%S'))
+
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=APP_LOG_FILE_MAX_BYTES, backupCount=APP_LOG_FILE_BACKUPS, encoding='utf-8'
+    )
+    file_handler.setLevel(APP_LOG_FILE_LEVEL)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt='%Y-%m-%d %H:%M:%S'))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(logging.DEBUG)
+
+    for subsystem, level in APP_LOG_LEVELS.items():
+        logging.getLogger(subsystem).setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def add_log_handler(handler):
+    '''Add a handler behind the queue, e.g. the GUI log window, so it also runs on the listener thread'''
+    if listener is None:
+        logging.getLogger().addHandler(handler)
+        return
+    listener.handlers = listener.handlers + (handler,)
+
+
+def stop_logging():
+    '''Write out the records still queued'''
+    global listener
+    if listener:
+        listener.stop()
+        listener = None
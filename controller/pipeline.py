@@ -0,0 +1,45 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SamplePipeline:
+    '''
+    Hands every new sample and run state change to the registered consumers, in order.
+
+    A consumer implements on_sample(sample), on_state(state, details) and/or on_event(event). Consumers are called on
+    the acquisition thread, so they must return quickly and queue any slow work for themselves.
+    '''
+    def __init__(self):
+        self.consumers = []
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def remove_consumer(self, consumer):
+        if consumer in self.consumers:
+            self.consumers.remove(consumer)
+
+    def publish_sample(self, sample):
+        for consumer in self.consumers:
+            if hasattr(consumer, 'on_sample'):
+                try:
+                    consumer.on_sample(sample)
+                except Exception as e:
+                    logger.error(f'{type(consumer).__name__} failed to handle sample. Error: {e}')
+
+    def publish_state(self, state, **details):
+        for consumer in self.consumers:
+            if hasattr(consumer, 'on_state'):
+                try:
+                    consumer.on_state(state, details)
+                except Exception as e:
+                    logger.error(f'{type(consumer).__name__} failed to handle state "{state}". Error: {e}')
+
+    def publish_event(self, event):
+        for consumer in self.consumers:
+            if hasattr(consumer, 'on_event'):
+                try:
+                    consumer.on_event(event)
+                except Exception as e:
+                    logger.error(f'{type(consumer).__name__} failed to handle {event.kind} event. Error: {e}')
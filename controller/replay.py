@@ -0,0 +1,89 @@
+import time
+import logging
+import threading
+
+from controller.sample import Sample, Event
+from storage.experiment_file import ExperimentFile, EVENT_MARKER, timed_rows
+
+logger = logging.getLogger(__name__)
+
+REPLAY_SPEEDS = [1, 10, 100, 1000]
+
+
+class Replay:
+    '''
+    Plays a recorded experiment log back as samples, in its own thread, at speed times real time.
+
+    Each sample keeps its recorded timestamp and is handed to on_sample, the same entry point the
+    Controller uses (App.log_experiment_data), and each logged event (setpoint change, interlock,
+    anomaly) to on_event (App.log_event), in the order they were logged, so storage, telemetry and
+    every other pipeline consumer see the run as they would live. Rows are scheduled against the
+    replay start rather than slept one by one, so slow consumers do not make the replay drift.
+    '''
+    def __init__(self, file_name, on_sample, speed=1, on_finished=None, on_event=None):
+        self.file_name = file_name
+        self.on_sample = on_sample
+        self.on_event = on_event
+        self.speed = speed
+        self.on_finished = on_finished
+
+        self.should_stop = threading.Event()
+        self.samples = 0
+        self.events = 0
+        self.thread = None
+
+        # Header is read straight away so the caller can set up the run before playback starts
+        self.experiment = ExperimentFile(file_name)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.should_stop.set()
+
+    def run(self):
+        columns = self.experiment.columns[1:]
+        logger.info(f'Replaying {self.file_name} at {self.speed}x')
+
+        start = time.perf_counter()
+        first_time = None
+        try:
+            rows = self.experiment.data_rows(include_events=self.on_event is not None)
+            for sample_time, cells in timed_rows(rows, self.experiment.date):
+                if first_time is None:
+                    first_time = sample_time
+
+                due = start + (sample_time - first_time).total_seconds() / self.speed
+                if self.should_stop.wait(max(0.0, due - time.perf_counter())):
+                    break
+
+                if cells and cells[0] == EVENT_MARKER:
+                    self.on_event(Event.from_row(sample_time, cells))
+                    self.events += 1
+                    continue
+
+                self.on_sample(Sample.from_row(sample_time, columns, cells))
+                self.samples += 1
+        except Exception as e:
+            logger.error(f'Replay of {self.file_name} failed. Error: {e}')
+        finally:
+            self.experiment.close()
+
+        elapsed = time.perf_counter() - start
+        logger.info(f'Replay finished: {self.samples} sample(s) and {self.events} event(s) in {elapsed:.2f} s ({self.samples / elapsed if elapsed else 0:.0f} samples/s)')
+        if self.on_finished:
+            self.on_finished()
+
+
+if __name__ == '__main__':
+    # Replay a run through a bare pipeline to measure how fast samples can be pushed through
+    # python -m controller.replay output/20250723_test.csv 1000
+    import sys
+    from controller.pipeline import SamplePipeline
+
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s - %(message)s', datefmt='%H:%M:%S')
+    pipeline = SamplePipeline()
+    replay = Replay(sys.argv[1], pipeline.publish_sample, speed=float(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+                    on_event=pipeline.publish_event)
+    replay.run()
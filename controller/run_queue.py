@@ -0,0 +1,217 @@
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+
+from controller.controller import duration_seconds
+from constants.interlocks import DEFAULT_INTERLOCK_RULES
+from constants.run_queue import RUN_QUEUE_SETTLE_TIME, SAVE_STATE_FILE
+
+logger = logging.getLogger(__name__)
+
+VOLTAGE_UNITS = ['V', 'A', 'mA']
+PUMP_DIRECTIONS = ['Clockwise', 'Counter-clockwise']
+DURATION_UNITS = ['minutes', 'hours']
+
+
+def load_saves(file_name=SAVE_STATE_FILE):
+    try:
+        with open(file_name, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def queued_run(entry, saves, author, index):
+    '''
+    One run of the queue as a complete save_state_data.json entry plus author and name. Fields written
+    next to "save" override the named save.
+    '''
+    if 'save' in entry and entry['save'] not in saves:
+        raise ValueError(f'Run {index}: no save called "{entry["save"]}" in {SAVE_STATE_FILE}')
+    run = {**saves.get(entry.get('save'), {}), **entry}
+    run['author'] = run.get('author', author)
+    run['name'] = run.get('name', run.get('save', f'queued_run_{index}'))
+
+    if not run['author']:
+        raise ValueError(f'Run {index}: no author')
+    if run.get('voltage', {}).get('unit', 'V') not in VOLTAGE_UNITS:
+        raise ValueError(f'Run {index}: invalid voltage unit "{run["voltage"]["unit"]}"')
+    if run.get('pump', {}).get('direction', 'Clockwise') not in PUMP_DIRECTIONS:
+        raise ValueError(f'Run {index}: invalid pump direction "{run["pump"]["direction"]}"')
+    if run.get('duration', {}).get('unit', 'hours') not in DURATION_UNITS:
+        raise ValueError(f'Run {index}: invalid duration unit "{run["duration"]["unit"]}"')
+
+    values = [
+        run.get('voltage', {}).get('value'),
+        run.get('pump', {}).get('speed'),
+        run.get('pump', {}).get('tubing'),
+        run.get('mfc_flow_rate'),
+        run.get('stirrer_speed'),
+        run.get('duration', {}).get('value')
+    ]
+    if any(value is None for value in values):
+        # Without a duration the run would never end and the queue never move on
+        raise ValueError(f'Run {index} ({run["name"]}): voltage, pump, flow rate, stirrer speed and duration are all needed')
+    if any(not isinstance(value, (int, float)) for value in values):
+        raise ValueError(f'Run {index} ({run["name"]}): setpoints and duration must be numbers')
+    return run
+
+
+def delay_seconds(delay):
+    '''Seconds of a settle or purge duration, given as seconds or as {"value", "unit"} like a run duration'''
+    if isinstance(delay, dict):
+        return duration_seconds(delay.get('value'), delay.get('unit', 'minutes')) or 0
+    return delay or 0
+
+
+def load_run_queue(file_name, saves_file=SAVE_STATE_FILE):
+    '''
+    Runs of a queue file, each checked before anything is started:
+    {
+        "author": "...",
+        "settle": {"value": 10, "unit": "minutes"},
+        "purge": {"flow_rate": 100.0, "duration": {"value": 5, "unit": "minutes"}},
+        "runs": [
+            {"name": "overnight_1", "save": "save_2"},
+            {"name": "overnight_2", "save": "save_3", "duration": {"value": 1, "unit": "hours"}},
+            {"name": "overnight_3", "voltage": {...}, "pump": {...}, "mfc_flow_rate": ..., ...}
+        ]
+    }
+    "settle" and "purge" are optional and may also be set on a run, applying after it.
+    '''
+    with open(file_name, 'r') as f:
+        definition = json.load(f)
+    if isinstance(definition, list):
+        definition = {'runs': definition}
+
+    saves = load_saves(saves_file)
+    runs = []
+    for index, entry in enumerate(definition.get('runs', []), start=1):
+        run = queued_run(entry, saves, definition.get('author'), index)
+        run.setdefault('settle', definition.get('settle', RUN_QUEUE_SETTLE_TIME))
+        run.setdefault('purge', definition.get('purge'))
+        runs.append(run)
+
+    if not runs:
+        raise ValueError(f'No runs in {file_name}')
+    return runs
+
+
+def experiment_values(run):
+    '''Run as the arguments App.set_experiment takes from NewExperimentToplevelWindow'''
+    return (
+        [run['author'], run['name']],
+        [
+            float(run['voltage']['value']),
+            float(run['pump']['speed']),
+            float(run['pump']['tubing']),
+            float(run['mfc_flow_rate']),
+            float(run['stirrer_speed'])
+        ],
+        [float(run['duration']['value'])],
+        [run['voltage'].get('unit', 'V'), run['pump'].get('direction', 'Clockwise'), run['duration'].get('unit', 'hours')],
+        run.get('interlocks', DEFAULT_INTERLOCK_RULES),
+        run.get('psu_channels', [])
+    )
+
+
+class RunQueue:
+    '''
+    Runs experiments back to back without anyone at the rig, in its own thread.
+
+    Each run goes through the same steps as by hand: App.set_experiment (pre-flight check, new log file
+    and device setup), Start, the controller stopping it once its duration is up, then Reset, which
+    closes the log. The queue waits for the controller to confirm the reset before settling or purging
+    and setting up the next run, so runs never overlap on the devices.
+
+    The queue stops after the current step when stop() is called (emergency stop, interlock shutdown),
+    when a run is reset by hand before its duration is up, or when a pre-flight check fails.
+    '''
+    def __init__(self, parent, runs, on_finished=None):
+        self.parent = parent
+        self.runs = runs
+        self.on_finished = on_finished
+
+        self.should_stop = threading.Event()
+        # 'finished', 'reset' and 'stop', in the order they happen
+        self.events = queue.Queue()
+        self.completed = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='run queue', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.should_stop.set()
+        self.events.put('stop')
+
+    def run_finished(self):
+        '''Called by the App once the controller has stopped the run at the end of its duration'''
+        self.events.put('finished')
+
+    def reset_complete(self):
+        '''Called by the App once the controller has been reset'''
+        self.events.put('reset')
+
+    def unique_name(self, name, used):
+        '''Each run gets its own log file, even when the queue repeats a name or it was used earlier today'''
+        candidate = self.parent.catalog.unique_name(datetime.now().date(), name, used)
+        used.add(candidate)
+        return candidate
+
+    def run(self):
+        logger.info(f'Run queue started: {len(self.runs)} run(s)')
+        used = set()
+        try:
+            for index, run in enumerate(self.runs, start=1):
+                if self.should_stop.is_set():
+                    break
+                run = {**run, 'name': self.unique_name(run['name'], used)}
+                logger.info(f'Queued run {index}/{len(self.runs)}: {run["name"]}')
+
+                if not self.parent.set_experiment(*experiment_values(run)):
+                    logger.error(f'Run queue stopped, {run["name"]} could not be set up')
+                    break
+                self.parent.after(0, self.parent.start_experiment)
+
+                event = self.events.get()
+                if event != 'finished':
+                    logger.warning(f'Run queue stopped during {run["name"]}')
+                    break
+                self.parent.after(0, self.parent.reset_experiment)
+                if self.events.get() != 'reset':
+                    break
+                self.completed += 1
+
+                if index < len(self.runs):
+                    self.between_runs(run)
+        except Exception as e:
+            logger.error(f'Run queue failed. Error: {e}')
+
+        logger.info(f'Run queue finished: {self.completed} of {len(self.runs)} run(s) completed')
+        if self.on_finished:
+            self.on_finished()
+
+    def between_runs(self, run):
+        purge = run.get('purge')
+        if purge:
+            self.parent.controller.purge(purge['flow_rate'], delay_seconds(purge.get('duration')), self.should_stop)
+
+        settle = delay_seconds(run.get('settle'))
+        if settle and not self.should_stop.is_set():
+            logger.info(f'Settling for {settle:g} s before the next run')
+            self.should_stop.wait(settle)
+
+
+if __name__ == '__main__':
+    # Check a queue file without running it
+    # python -m controller.run_queue queues/overnight.json
+    import sys
+
+    for number, queued in enumerate(load_run_queue(sys.argv[1]), start=1):
+        duration = queued['duration']
+        print(f'{number}. {queued["name"]} by {queued["author"]}: {duration["value"]:g} {duration["unit"]}, '
+              f'then settle {delay_seconds(queued["settle"]):g} s' + (', purge' if queued.get('purge') else ''))
@@ -0,0 +1,150 @@
+from components.powerSupply import PowerSupplyReading
+from components.pump import PumpReading
+from components.mfc import MassFlowReading
+from components.stirrer import StirrerReading
+from storage.experiment_file import EVENT_MARKER
+
+# Column names of the data section in the experiment file, in the same order as Sample.to_row()
+DATA_HEADER = [
+    'Time',
+    'Voltage', 'Current',
+    'Pump speed', 'Pump running',
+    'Pressure', 'Temperature', 'Volumetric flow', 'Flow rate', 'Flow setpoint', 'Gas', 'MFC status',
+    'Stirrer speed', 'Stirrer set speed'
+]
+
+
+def data_header(psu_channels=1):
+    '''DATA_HEADER followed by a voltage and current column for every PSU channel after the first'''
+    extra = []
+    for channel in range(2, psu_channels + 1):
+        extra.extend([f'Voltage {channel}', f'Current {channel}'])
+    return DATA_HEADER + extra
+
+
+def psu_channel_count(columns):
+    '''Number of PSU channels logged under a data header'''
+    channels = 1
+    while f'Voltage {channels + 1}' in columns:
+        channels += 1
+    return channels
+
+
+# Reading fields that hold text rather than numbers
+TEXT_FIELDS = ('gas', 'status')
+
+
+def parse_cell(cell):
+    '''Logged cell back to a value: '' is missing, numbers and flags are converted, anything else is text'''
+    if cell == '' or cell is None:
+        return None
+    if cell in ('True', 'False'):
+        return cell == 'True'
+    try:
+        return float(cell)
+    except ValueError:
+        return cell
+
+
+class Sample:
+    '''One snapshot of every device, taken once per controller cycle'''
+    __slots__ = ('time', 'psu', 'pump', 'mfc', 'stirrer', 'psu_channels')
+
+    # Reading type of each device, used to pad the row when a device did not answer
+    READING_TYPES = (
+        ('psu', PowerSupplyReading),
+        ('pump', PumpReading),
+        ('mfc', MassFlowReading),
+        ('stirrer', StirrerReading)
+    )
+
+    def __init__(self, time, psu=None, pump=None, mfc=None, stirrer=None, psu_channels=()):
+        self.time = time
+        self.psu = psu
+        self.pump = pump
+        self.mfc = mfc
+        self.stirrer = stirrer
+        # Readings of PSU channels 2 onwards (psu is channel 1), None for a channel that did not answer
+        self.psu_channels = psu_channels
+
+    def to_row(self):
+        row = [self.time.strftime('%H:%M:%S')]
+        for name, reading_type in Sample.READING_TYPES:
+            reading = getattr(self, name)
+            row.extend(reading if reading is not None else [''] * len(reading_type._fields))
+        for reading in self.psu_channels:
+            row.extend(reading if reading is not None else ['', ''])
+        return row
+
+    @staticmethod
+    def from_row(time, columns, cells):
+        '''
+        Rebuild a sample from logged cells, columns being the data header without 'Time'.
+        Columns are matched by name so older logs with fewer columns still load, placeholder
+        cells such as 'V' become None.
+        '''
+        values = dict(zip(columns, cells))
+        readings = {}
+        column = 1
+        for name, reading_type in Sample.READING_TYPES:
+            fields = {}
+            for field in reading_type._fields:
+                value = parse_cell(values.get(DATA_HEADER[column]))
+                fields[field] = value if not isinstance(value, str) or field in TEXT_FIELDS else None
+                column += 1
+            if any(value is not None for value in fields.values()):
+                readings[name] = reading_type(**fields)
+
+        psu_channels = []
+        channel = 2
+        while f'Voltage {channel}' in values:
+            voltage = parse_cell(values.get(f'Voltage {channel}'))
+            current = parse_cell(values.get(f'Current {channel}'))
+            has_reading = isinstance(voltage, float) or isinstance(current, float)
+            psu_channels.append(PowerSupplyReading(voltage, current) if has_reading else None)
+            channel += 1
+        return Sample(time, psu_channels=tuple(psu_channels), **readings)
+
+    def to_dict(self):
+        sample = {'time': self.time.isoformat()}
+        for name, _ in Sample.READING_TYPES:
+            reading = getattr(self, name)
+            sample[name] = reading._asdict() if reading is not None else None
+        if self.psu_channels:
+            sample['psu_channels'] = [reading._asdict() if reading is not None else None for reading in self.psu_channels]
+        return sample
+
+    def __repr__(self):
+        return f'Sample(time={self.time:%H:%M:%S}, psu={self.psu}, pump={self.pump}, mfc={self.mfc}, stirrer={self.stirrer})'
+
+
+class Event:
+    '''Something that happened during the run, e.g. a setpoint change or an anomaly, logged as its own row between the samples'''
+    __slots__ = ('time', 'kind', 'name', 'value', 'unit', 'detail')
+
+    def __init__(self, time, kind, name, value, unit='', detail=''):
+        self.time = time
+        self.kind = kind
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.detail = detail
+
+    def to_row(self):
+        return [self.time.strftime('%H:%M:%S'), EVENT_MARKER, self.kind, self.name, self.value, self.unit, self.detail]
+
+    @staticmethod
+    def from_row(time, cells):
+        '''Rebuild an event from the logged cells after 'Time', starting with the event marker'''
+        kind, name, value, unit, detail = (list(cells[1:]) + [''] * 5)[:5]
+        value = parse_cell(value)
+        return Event(time, kind, name, value if value is not None else '', unit, detail)
+
+    def to_dict(self):
+        return {
+            'time': self.time.isoformat(), 'kind': self.kind, 'name': self.name,
+            'value': self.value, 'unit': self.unit, 'detail': self.detail
+        }
+
+    def __repr__(self):
+        return f'Event(time={self.time:%H:%M:%S}, kind={self.kind}, name={self.name}, value={self.value}, unit={self.unit})'
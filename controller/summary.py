@@ -0,0 +1,163 @@
+import os
+import csv
+import math
+import logging
+import threading
+from datetime import timedelta
+
+from analysis.analytics import TEXT_COLUMNS
+from constants.storage import SUMMARY_WINDOWS, SUMMARY_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    '''Count, mean, standard deviation, min and max of a stream, updated in constant time per value (Welford)'''
+    __slots__ = ('count', 'mean', 'm2', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        # Sum of squared differences from the mean, without the cancellation of sum(x^2) - n * mean^2
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    @property
+    def std(self):
+        '''Sample standard deviation, as pandas gives it, NaN for fewer than two values'''
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+def summary_path(log_file_name, window, directory=SUMMARY_DIRECTORY):
+    '''output/20250723_test.csv -> output/summary/20250723_test_60s.csv, out of the way of the run archive'''
+    base_name = os.path.basename(log_file_name)
+    for suffix in ('.manifest.json', '.csv'):
+        base_name = base_name.removesuffix(suffix)
+    return os.path.join(directory, f'{base_name}_{window}s.csv')
+
+
+def summary_cell(value):
+    return '' if math.isnan(value) or math.isinf(value) else f'{value:.6g}'
+
+
+class SummaryWindow:
+    '''Statistics of every channel over consecutive windows of a fixed length, one row per finished window'''
+    def __init__(self, file_name, seconds, channels):
+        self.seconds = seconds
+        self.stats = [RunningStats() for _ in channels]
+        self.start = None
+        self.end = None
+        self.samples = 0
+
+        self.file = open(file_name, 'w', newline='')
+        self.writer = csv.writer(self.file, quoting=csv.QUOTE_ALL)
+        header = ['Start', 'End', 'Samples']
+        for channel in channels:
+            header.extend([f'{channel} mean', f'{channel} std', f'{channel} min', f'{channel} max'])
+        self.writer.writerow(header)
+        self.file.flush()
+
+    def add(self, time, values):
+        if self.start is not None and time >= self.end:
+            self.write_row()
+        if self.start is None:
+            # Windows line up with the clock (10:00, 10:01, ...) so summaries of different runs compare
+            since_midnight = time.hour * 3600 + time.minute * 60 + time.second + time.microsecond / 1e6
+            self.start = time - timedelta(seconds=since_midnight % self.seconds)
+            self.end = self.start + timedelta(seconds=self.seconds)
+
+        self.samples += 1
+        for stats, value in zip(self.stats, values):
+            if value is not None:
+                stats.add(value)
+
+    def write_row(self):
+        row = [self.start.strftime('%Y-%m-%d %H:%M:%S'), self.end.strftime('%Y-%m-%d %H:%M:%S'), self.samples]
+        for stats in self.stats:
+            if stats.count:
+                row.extend([summary_cell(stats.mean), summary_cell(stats.std), summary_cell(stats.minimum), summary_cell(stats.maximum)])
+            else:
+                row.extend([''] * 4)
+            stats.reset()
+        self.writer.writerow(row)
+        self.file.flush()
+        self.start = None
+        self.samples = 0
+
+    def close(self):
+        # The last, partial window is kept, its End says how far it would have gone
+        if self.start is not None:
+            self.write_row()
+        self.file.close()
+
+
+class SummaryLog:
+    '''
+    SamplePipeline consumer writing a compact summary log beside the raw experiment log: for every window
+    length in windows, one row per window with the mean, std, min and max of each numeric channel.
+
+    Statistics are updated as each sample arrives, so nothing is held but the running totals, and a
+    dashboard or report reads a few kilobytes instead of the whole raw file.
+    '''
+    def __init__(self, log_file_name, data_header, windows=SUMMARY_WINDOWS, directory=SUMMARY_DIRECTORY):
+        self.columns = [
+            index for index, column in enumerate(data_header[1:])
+            if column not in TEXT_COLUMNS
+        ]
+        channels = [data_header[1:][index] for index in self.columns]
+
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.windows = [SummaryWindow(summary_path(log_file_name, seconds, directory), seconds, channels) for seconds in windows]
+        self.file_names = [window.file.name for window in self.windows]
+
+    def on_sample(self, sample):
+        cells = sample.to_row()[1:]
+        values = []
+        for index in self.columns:
+            cell = cells[index] if index < len(cells) else None
+            # Flags count as 0/1, so the mean of Pump running is the fraction of the window it ran
+            values.append(float(cell) if isinstance(cell, (int, float)) else None)
+
+        with self.lock:
+            for window in self.windows:
+                window.add(sample.time, values)
+
+    def close(self):
+        with self.lock:
+            for window in self.windows:
+                window.close()
+            self.windows = []
+
+
+def read_summary(file_name):
+    '''Summary log as a DataFrame with Start/End as timestamps'''
+    import pandas as pd
+    return pd.read_csv(file_name, parse_dates=['Start', 'End'])
+
+
+if __name__ == '__main__':
+    # Write the summary logs of a run recorded before they existed
+    # python -m controller.summary output/20250723_test.csv
+    import sys
+    from controller.sample import Sample
+    from storage.experiment_file import ExperimentFile, timed_rows
+
+    with ExperimentFile(sys.argv[1]) as experiment:
+        summary = SummaryLog(sys.argv[1], experiment.columns)
+        for sample_time, cells in timed_rows(experiment.data_rows(), experiment.date):
+            summary.on_sample(Sample.from_row(sample_time, experiment.columns[1:], cells))
+        summary.close()
+    print('\n'.join(summary.file_names))
@@ -0,0 +1,146 @@
+import json
+import socket
+import logging
+import threading
+import collections
+from datetime import datetime
+
+from constants.telemetry import TELEMETRY_HOST, TELEMETRY_PORT, TELEMETRY_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    '''One connected client with its own bounded queue and sender thread'''
+    def __init__(self, connection, address, queue_size):
+        self.connection = connection
+        self.address = address
+        self.messages = collections.deque(maxlen=queue_size)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, message):
+        with self.condition:
+            if len(self.messages) == self.messages.maxlen:
+                self.dropped += 1
+            self.messages.append(message)
+            self.condition.notify()
+
+    def send_messages(self):
+        try:
+            while True:
+                with self.condition:
+                    while not self.messages and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    message = self.messages.popleft()
+                self.connection.sendall(message)
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+
+class TelemetryServer:
+    '''
+    Streams live samples, run state and events (setpoint changes) to any number of local clients over TCP,
+    one JSON message per line, e.g. {"type": "sample", "time": ..., "psu": {"voltage": ..., "current": ...}, ...}.
+
+    Consumer of the SamplePipeline: publishing only appends to each subscriber's bounded queue, so a
+    slow client loses its oldest messages instead of holding up acquisition. New clients are sent the
+    current state and latest sample straight away.
+    '''
+    def __init__(self, host=TELEMETRY_HOST, port=TELEMETRY_PORT, queue_size=TELEMETRY_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.last_state = None
+        self.last_sample = None
+        self.server_socket = None
+
+    def start(self):
+        self.server_socket = socket.create_server((self.host, self.port))
+        # Port 0 picks a free port, keep the real one
+        self.port = self.server_socket.getsockname()[1]
+        threading.Thread(target=self.accept_clients, daemon=True).start()
+        logger.info(f'Telemetry server listening on {self.host}:{self.port}')
+
+    def stop(self):
+        if self.server_socket:
+            self.server_socket.close()
+            self.server_socket = None
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def accept_clients(self):
+        while self.server_socket:
+            try:
+                connection, address = self.server_socket.accept()
+            except OSError:
+                return
+
+            subscriber = Subscriber(connection, address, self.queue_size)
+            with self.lock:
+                for message in (self.last_state, self.last_sample):
+                    if message:
+                        subscriber.put(message)
+                self.subscribers.append(subscriber)
+            threading.Thread(target=self.serve_subscriber, args=(subscriber,), daemon=True).start()
+            logger.info(f'Telemetry client connected from {address[0]}:{address[1]}')
+
+    def serve_subscriber(self, subscriber):
+        subscriber.send_messages()
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+        logger.info(f'Telemetry client {subscriber.address[0]}:{subscriber.address[1]} disconnected ({subscriber.dropped} message(s) dropped)')
+
+    def broadcast(self, message):
+        # Encoded once and shared by every subscriber
+        data = (json.dumps(message) + '\n').encode()
+        with self.lock:
+            if message['type'] == 'sample':
+                self.last_sample = data
+            elif message['type'] == 'state':
+                self.last_state = data
+            for subscriber in self.subscribers:
+                subscriber.put(data)
+
+    def on_sample(self, sample):
+        self.broadcast({'type': 'sample', **sample.to_dict()})
+
+    def on_state(self, state, details):
+        self.broadcast({'type': 'state', 'state': state, 'time': datetime.now().isoformat(), **details})
+
+    def on_event(self, event):
+        self.broadcast({'type': 'event', **event.to_dict()})
+
+
+def read_telemetry(host=TELEMETRY_HOST, port=TELEMETRY_PORT):
+    '''Connect to a telemetry server and yield each decoded message'''
+    with socket.create_connection((host, port)) as connection:
+        with connection.makefile('r') as stream:
+            for line in stream:
+                yield json.loads(line)
+
+
+if __name__ == '__main__':
+    # Print the live stream of a running experiment
+    for message in read_telemetry():
+        print(message)
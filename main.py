@@ -1,6 +1,5 @@
 import os
 import re
-import csv
 import sys
 import glob
 import json
@@ -14,16 +13,36 @@ import numpy as np
 import pandas as pd
 import tkinter as tk
 import customtkinter as ctk
+from tkinter import filedialog
 from datetime import datetime, timedelta
 from PIL import Image
 
-from controller.controller import Controller
-
-logging.basicConfig(
-    level=logging.DEBUG, 
-    format='[%(levelname)s] %(asctime)s - %(message)s',
-    datefmt='%H:%M:%S'
-)
+from controller.controller import Controller, SETPOINTS
+from controller.sample import data_header, psu_channel_count
+from controller.pipeline import SamplePipeline
+from controller.telemetry import TelemetryServer
+from controller.replay import Replay, REPLAY_SPEEDS
+from controller.run_queue import RunQueue, load_run_queue
+from controller.summary import SummaryLog
+from controller.anomaly import AnomalyDetector
+from components.capture import dump_capture
+from storage.experiment_log import create_experiment_log
+from storage.catalog import ExperimentCatalog
+from storage.experiment_file import is_experiment_log
+from analysis.history import RunHistory, prepare_history
+from constants.storage import LOG_MODE, SUMMARY_WINDOWS
+from constants.interlocks import DEFAULT_INTERLOCK_RULES
+from constants.telemetry import TELEMETRY_ENABLED
+from controller.logs import setup_logging, add_log_handler, stop_logging
+from constants.ports import PSU_CHANNELS
+from constants.logs import APP_LOG_WINDOW_LEVEL
+from constants.analysis import HISTORY_POINTS
+from constants.run_queue import RUN_QUEUE_DIRECTORY
+from constants.anomaly import ANOMALY_DETECTION
+from constants.capture import CAPTURE_ENABLED
+
+# Subsystem name of the GUI in APP_LOG_LEVELS
+logger = logging.getLogger('gui')
 
 ctk.set_appearance_mode('system')
 ctk.set_default_color_theme('blue')
@@ -42,6 +61,8 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         self.duration_units_var = 'hours'
         self.pump_direction_var = 'Clockwise'
         self.save_state_var = tk.IntVar()
+        self.interlock_rules = DEFAULT_INTERLOCK_RULES
+        self.psu_channels = []
 
     def validate_numeric_entry(self, entry):
         try:
@@ -49,11 +70,11 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         except ValueError:
             entry.delete(0, 'end')
             entry.configure(placeholder_text_color=App.COLOUR_BRIGHT_RED)
-            logging.error(f'Invalid numeric entry in: {entry.cget("placeholder_text")}')
+            logger.error(f'Invalid numeric entry in: {entry.cget("placeholder_text")}')
             return None
 
     def reset_entry_fields(self):
-        logging.debug('Resetting entry fields to empty.')
+        logger.debug('Resetting entry fields to empty.')
 
         self.voltage_entry.delete(0, 'end')
         self.pump_speed_entry.delete(0, 'end')
@@ -84,7 +105,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
 
         # Validate that its loading a correct unit
         if voltage_unit not in valid_voltage_units:
-            logging.warning(f'Invalid voltage unit "{voltage_unit}". Defaulting to "V".')
+            logger.warning(f'Invalid voltage unit "{voltage_unit}". Defaulting to "V".')
             voltage_unit = 'V'
 
         self.set_entry_value(self.voltage_entry, voltage_value)
@@ -99,7 +120,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
 
         # Validate that its loading a correct direction
         if pump_direction not in valid_pump_direction:
-            logging.warning(f'Invalid pump direction "{pump_direction}". Defaulting to "Clockwise".')
+            logger.warning(f'Invalid pump direction "{pump_direction}". Defaulting to "Clockwise".')
             pump_direction = 'Clockwise'
 
         self.set_entry_value(self.pump_speed_entry, pump_speed)
@@ -118,22 +139,28 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
 
         # Validate that its loading a correct unit
         if duration_unit not in valid_duration_units:
-            logging.warning(f'Invalid duration unit "{duration_unit}". Defaulting to "hours".')
+            logger.warning(f'Invalid duration unit "{duration_unit}". Defaulting to "hours".')
             duration_unit = 'hours'
 
         self.set_entry_value(self.duration_entry, duration_value)
         self.duration_units_options.set(duration_unit)
         self.duration_units_var = duration_unit
 
+        # --- Interlocks and PSU channel 2+ setpoints (optional, no entry fields) ---
+        self.interlock_rules = save_data.get('interlocks', DEFAULT_INTERLOCK_RULES)
+        self.psu_channels = save_data.get('psu_channels', [])
+
     def save_state_event(self):
         save_state = self.save_state_var.get()
-        logging.info(f'Selected save state: {"custom" if save_state == 0 else f"save {save_state}"}')
+        logger.info(f'Selected save state: {"custom" if save_state == 0 else f"save {save_state}"}')
 
         # Only enable the overwrite button for the saves not custom entry
         if save_state == 0:
             self.overwrite_button.configure(fg_color=App.COLOUR_GREY, hover_color=App.COLOUR_GREY, state='disabled')
             # Need to clear the entry fields in the event that user clicked save then custom
             self.reset_entry_fields()
+            self.interlock_rules = DEFAULT_INTERLOCK_RULES
+            self.psu_channels = []
         else:
             self.overwrite_button.configure(fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE, state='normal')
 
@@ -144,18 +171,18 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
                 save_key = f'save_{save_state}'
                 if save_key in saves:
                     self.load_save_into_fields(saves[save_key])
-                    logging.info(f'Successfully loaded from {save_key}.')
+                    logger.info(f'Successfully loaded from {save_key}.')
                 else:
-                    logging.warning(f'No save data found for {save_key}.')
+                    logger.warning(f'No save data found for {save_key}.')
             except Exception as e:
-                logging.error(f'Error loading save file: {e}')
+                logger.error(f'Error loading save file: {e}')
 
     def overwrite_save_data(self):
         save_state = self.save_state_var.get()
 
         # This should never happen because overwrite save button is disabled, but just for safety
         if save_state == 0:
-            logging.warning('Overwrite attempt in custom mode. Ignored.')
+            logger.warning('Overwrite attempt in custom mode. Ignored.')
             return
 
         # Validate the entry fields first
@@ -168,7 +195,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         duration_value = self.validate_numeric_entry(self.duration_entry) if self.duration_entry.get() else None
 
         if None in [voltage, pump_speed, tubing_size, mfc_flow_rate, stirrer_speed]:
-            logging.error('Failed to overwrite save. One or more required fields are invalid.')
+            logger.error('Failed to overwrite save. One or more required fields are invalid.')
             return
 
         # Collect the units (no need validation because they are from a dropdown)
@@ -189,12 +216,16 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         try:
             with open('save_state_data.json', 'r') as f:
                 data = json.load(f)
+            # Interlock rules and PSU channel setpoints are edited in the file only, keep them
+            for key in ('interlocks', 'psu_channels'):
+                if key in data.get(save_key, {}):
+                    new_save[key] = data[save_key][key]
             data[save_key] = new_save
             with open('save_state_data.json', 'w') as f:
                 json.dump(data, f, indent=4)
-            logging.info(f'Successfully overwrote {save_key}.')
+            logger.info(f'Successfully overwrote {save_key}.')
         except Exception as e:
-            logging.error(f'Error saving data: {e}')
+            logger.error(f'Error saving data: {e}')
 
 
     def build_ui(self):
@@ -421,16 +452,16 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         self.pump_direction_var = choice
 
     def confirm_data_entry(self):
-        logging.info('Confirming data entry...')
+        logger.info('Confirming data entry...')
         
         # Details entry fields
         detail_fields = [self.username_entry, self.filename_entry]
         detail_values = []
 
-        logging.debug('Validating detail fields...')
+        logger.debug('Validating detail fields...')
         for entry in detail_fields:
             if not entry.get():
-                logging.error(f'Missing required field: {entry.cget("placeholder_text")}')
+                logger.error(f'Missing required field: {entry.cget("placeholder_text")}')
                 entry.configure(placeholder_text_color=App.COLOUR_BRIGHT_RED)
                 return
             detail_values.append(entry.get())
@@ -445,7 +476,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         ]
         required_values = []
 
-        logging.debug('Validating mandatory numeric fields...')
+        logger.debug('Validating mandatory numeric fields...')
         for entry in required_fields:
             value = self.validate_numeric_entry(entry)
             if value is None:
@@ -456,7 +487,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         optional_fields = [self.duration_entry]
         optional_values = []
 
-        logging.debug('Validating optional fields...')
+        logger.debug('Validating optional fields...')
         for entry in optional_fields:
             if entry.get():
                 value = self.validate_numeric_entry(entry)
@@ -469,7 +500,7 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
         # Units (no need validation because they are from a dropdown)
         mode_select_values = [self.voltage_units_var, self.pump_direction_var, self.duration_units_var]
 
-        logging.info('All fields validated. Sending data to parent...')
+        logger.info('All fields validated. Sending data to parent...')
 
         # Run in background thread, otherwise it stops the window from automatically closing
         def setup_experiment_for_controller():
@@ -477,31 +508,335 @@ class NewExperimentToplevelWindow(ctk.CTkToplevel):
                 detail_values,
                 required_values,
                 optional_values,
-                mode_select_values
+                mode_select_values,
+                self.interlock_rules,
+                self.psu_channels
             )
         threading.Thread(target=setup_experiment_for_controller, daemon=True).start()
 
-        logging.info('Data entry confirmed and closing window now.')
+        logger.info('Data entry confirmed and closing window now.')
         self.destroy()
 
 
+class HistoryToplevelWindow(ctk.CTkToplevel):
+    '''
+    Finished runs from the catalog, and a plot of one channel of the selected run.
+
+    A run is opened from memory-mapped channel files (converted once, in the background, the first
+    time). The whole run is drawn as a min/max envelope of at most HISTORY_POINTS points; dragging
+    across the plot zooms in and loads every sample of that window once it is short enough.
+    '''
+    PLOT_WIDTH = 720
+    PLOT_HEIGHT = 360
+    MARGIN = 50
+
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parent = parent
+        self.history = None
+        self.view = (None, None)
+        self.x_range = None
+        self.drag_start = None
+
+        self.build_ui()
+        self.list_runs()
+
+    def build_ui(self):
+        self.title('History')
+        self.geometry(f'{HistoryToplevelWindow.PLOT_WIDTH + 280}x{HistoryToplevelWindow.PLOT_HEIGHT + 160}')
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.runs_frame = ctk.CTkScrollableFrame(self, width=220, label_text='Runs')
+        self.runs_frame.grid(row=0, column=0, rowspan=3, padx=10, pady=10, sticky='ns')
+
+        self.plot_controls = ctk.CTkFrame(self, fg_color='transparent')
+        self.plot_controls.grid(row=0, column=1, padx=10, pady=(10, 0), sticky='ew')
+
+        self.channel_options = ctk.CTkOptionMenu(self.plot_controls, values=['-'], command=lambda _: self.draw())
+        self.channel_options.grid(row=0, column=0, padx=5)
+
+        self.full_run_button = ctk.CTkButton(
+            self.plot_controls,
+            text='Full run',
+            width=80,
+            fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+            command=self.show_full_run
+        )
+        self.full_run_button.grid(row=0, column=1, padx=5)
+
+        self.status_label = ctk.CTkLabel(self.plot_controls, text='Select a run')
+        self.status_label.grid(row=0, column=2, padx=10, sticky='w')
+
+        self.canvas = tk.Canvas(
+            self, width=HistoryToplevelWindow.PLOT_WIDTH, height=HistoryToplevelWindow.PLOT_HEIGHT,
+            background='white', highlightthickness=0
+        )
+        self.canvas.grid(row=1, column=1, padx=10, pady=10, sticky='nsew')
+        self.canvas.bind('<ButtonPress-1>', self.start_zoom)
+        self.canvas.bind('<B1-Motion>', self.drag_zoom)
+        self.canvas.bind('<ButtonRelease-1>', self.finish_zoom)
+
+    def list_runs(self):
+        for run in self.parent.catalog.find_runs():
+            ctk.CTkButton(
+                self.runs_frame,
+                text=f'{run["run_date"]}  {run["name"]}',
+                anchor='w',
+                fg_color='transparent', text_color=('gray10', 'gray90'), hover_color=App.COLOUR_GREY,
+                command=lambda path=run['path']: self.open_run(path)
+            ).pack(fill='x', pady=1)
+
+    def open_run(self, file_name):
+        self.status_label.configure(text=f'Opening {os.path.basename(file_name)}...')
+
+        # The first open converts the run, which can take a few seconds for a long one
+        def load():
+            try:
+                history = RunHistory(file_name)
+            except Exception as e:
+                logger.error(f'Could not open {file_name}. Error: {e}')
+                history = None
+            try:
+                self.after(0, self.show_run, history)
+            except tk.TclError:
+                # Window closed while the run was loading
+                pass
+        threading.Thread(target=load, daemon=True).start()
+
+    def show_run(self, history):
+        if not self.winfo_exists():
+            return
+        if history is None:
+            self.status_label.configure(text='Could not open run')
+            return
+        self.history = history
+        self.view = (None, None)
+        channels = history.channels or ['-']
+        self.channel_options.configure(values=channels)
+        if self.channel_options.get() not in channels:
+            self.channel_options.set(channels[0])
+        self.draw()
+
+    def show_full_run(self):
+        self.view = (None, None)
+        self.draw()
+
+    def draw(self):
+        self.canvas.delete('all')
+        history = self.history
+        if history is None or not history.rows or self.channel_options.get() not in history.channels:
+            return
+
+        start, end = self.view
+        seconds, values = history.window(self.channel_options.get(), start, end)
+        if start is None:
+            start = float(seconds[0]) if len(seconds) else 0.0
+        if end is None:
+            end = float(seconds[-1]) if len(seconds) else 0.0
+
+        finite = values[np.isfinite(values)]
+        low, high = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+        if high == low:
+            low, high = low - 1, high + 1
+
+        margin = HistoryToplevelWindow.MARGIN
+        width = self.canvas.winfo_width() if self.canvas.winfo_width() > 1 else HistoryToplevelWindow.PLOT_WIDTH
+        height = self.canvas.winfo_height() if self.canvas.winfo_height() > 1 else HistoryToplevelWindow.PLOT_HEIGHT
+        x_scale = (width - 2 * margin) / max(end - start, 1e-9)
+        y_scale = (height - 2 * margin) / (high - low)
+        self.x_range = (margin, x_scale, start)
+
+        # One line per run of valid values, missing readings leave a gap
+        points = []
+        for second, value in zip(seconds, values):
+            if math.isfinite(value):
+                points.extend((margin + (second - start) * x_scale, height - margin - (value - low) * y_scale))
+            elif points:
+                self.draw_line(points)
+                points = []
+        self.draw_line(points)
+
+        self.canvas.create_rectangle(margin, margin, width - margin, height - margin, outline=App.COLOUR_GREY)
+        self.canvas.create_text(margin - 5, margin, text=f'{high:.4g}', anchor='e')
+        self.canvas.create_text(margin - 5, height - margin, text=f'{low:.4g}', anchor='e')
+        self.canvas.create_text(margin, height - margin + 15, text=self.time_text(start), anchor='w')
+        self.canvas.create_text(width - margin, height - margin + 15, text=self.time_text(end), anchor='e')
+
+        full_resolution = history.samples_between(*self.view) <= HISTORY_POINTS
+        self.status_label.configure(
+            text=f'{history.name}: {history.rows} samples, {len(seconds)} points shown'
+                 f'{" (every sample)" if full_resolution else " (min/max envelope)"}'
+        )
+
+    def draw_line(self, points):
+        if len(points) >= 4:
+            self.canvas.create_line(points, fill=App.COLOUR_BRIGHT_BLUE)
+        elif len(points) == 2:
+            x, y = points
+            self.canvas.create_oval(x - 1, y - 1, x + 1, y + 1, outline=App.COLOUR_BRIGHT_BLUE)
+
+    def time_text(self, seconds):
+        start = datetime.fromisoformat(self.history.metadata['start'])
+        return (start + timedelta(seconds=float(seconds))).strftime('%d/%m %H:%M:%S')
+
+    def start_zoom(self, event):
+        self.drag_start = event.x
+        self.canvas.delete('zoom')
+
+    def drag_zoom(self, event):
+        if self.drag_start is None:
+            return
+        self.canvas.delete('zoom')
+        self.canvas.create_rectangle(self.drag_start, 0, event.x, self.canvas.winfo_height(), outline=App.COLOUR_DARK_BLUE, tags='zoom')
+
+    def finish_zoom(self, event):
+        if self.drag_start is None or self.x_range is None or abs(event.x - self.drag_start) < 5:
+            self.drag_start = None
+            return
+        margin, x_scale, start = self.x_range
+        left, right = sorted((self.drag_start, event.x))
+        self.drag_start = None
+        self.view = (start + (left - margin) / x_scale, start + (right - margin) / x_scale)
+        self.draw()
+
+
 # Custom handler to write logs to the GUI textbox
 class TextBoxHandler(logging.Handler):
+    # Records are emitted on the log listener thread, the Tk thread picks them up this often
+    WRITE_MS = 200
+
     def __init__(self, textbox):
         super().__init__()
         self.textbox = textbox
+        self.lines = collections.deque(maxlen=1000)
+        self.textbox.after(TextBoxHandler.WRITE_MS, self.write_lines)
 
     def emit(self, record):
-        log_entry = self.format(record)
-        self.textbox.configure(state='normal')
-        self.textbox.insert('end', f'\n{log_entry}')
-        self.textbox.configure(state='disabled')
-        self.textbox.see('end')  # Auto-scroll to bottom
+        self.lines.append(self.format(record))
+
+    def write_lines(self):
+        if self.lines:
+            entries = []
+            while self.lines:
+                entries.append(self.lines.popleft())
+            self.textbox.configure(state='normal')
+            self.textbox.insert('end', '\n' + '\n'.join(entries))
+            self.textbox.configure(state='disabled')
+            self.textbox.see('end')  # Auto-scroll to bottom
+        self.textbox.after(TextBoxHandler.WRITE_MS, self.write_lines)
+
+
+class LiveReadoutFrame(ctk.CTkFrame):
+    '''
+    Latest value of each channel and the state of each device.
+
+    on_sample and on_event only keep a reference to the newest sample and anomaly (acquisition thread). The Tk loop redraws
+    every refresh_ms at most, and only reconfigures labels whose text has changed, so redraw cost
+    does not grow with the sample rate.
+    '''
+    # Title, device, reading field, unit, format
+    READOUTS = [
+        ('Voltage', 'psu', 'voltage', 'V', '{:.3f}'),
+        ('Current', 'psu', 'current', 'A', '{:.3f}'),
+        ('Flow', 'mfc', 'mass_flow', 'sccm', '{:.1f}'),
+        ('Pump', 'pump', 'speed', 'rpm', '{:.0f}'),
+        ('Stirrer', 'stirrer', 'speed', 'rpm', '{:.0f}')
+    ]
+    DEVICES = [('PSU', 'psu'), ('Pump', 'pump'), ('MFC', 'mfc'), ('Stirrer', 'stirrer')]
+
+    def __init__(self, parent, refresh_ms, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.refresh_ms = refresh_ms
+        self.latest_sample = None
+        self.latest_anomaly = None
+        self.device_states = {device: 'not connected' for _, device in LiveReadoutFrame.DEVICES}
+        self.shown = {}
+
+        self.build_ui()
+        self.after(self.refresh_ms, self.refresh)
+
+    def build_ui(self):
+        self.grid_columnconfigure(tuple(range(len(LiveReadoutFrame.READOUTS))), weight=1)
+
+        title = ctk.CTkLabel(self, text='Live Readings', font=('Futura', 20))
+        title.grid(row=0, column=0, columnspan=len(LiveReadoutFrame.READOUTS), padx=10, pady=10, sticky='ew')
+
+        self.value_labels = {}
+        for column, (name, _, _, unit, _) in enumerate(LiveReadoutFrame.READOUTS):
+            ctk.CTkLabel(self, text=f'{name} ({unit})').grid(row=1, column=column, padx=5, sticky='ew')
+            self.value_labels[name] = ctk.CTkLabel(self, text='-', font=('Futura', 18))
+            self.value_labels[name].grid(row=2, column=column, padx=5, sticky='ew')
+
+        self.state_labels = {}
+        for column, (name, device) in enumerate(LiveReadoutFrame.DEVICES):
+            self.state_labels[device] = ctk.CTkLabel(self, text=f'{name}: -')
+            self.state_labels[device].grid(row=3, column=column, padx=5, pady=(5, 10), sticky='ew')
+
+        self.anomaly_label = ctk.CTkLabel(self, text='No anomalies', text_color=App.COLOUR_GREY)
+        self.anomaly_label.grid(row=4, column=0, columnspan=len(LiveReadoutFrame.READOUTS), padx=5, pady=(0, 10), sticky='ew')
+
+    def set_device_state(self, device, state):
+        self.device_states[device] = state
+
+    def on_sample(self, sample):
+        self.latest_sample = sample
+
+    def on_event(self, event):
+        if event.kind == 'Anomaly':
+            self.latest_anomaly = event
+
+    def on_state(self, state, details):
+        if state == 'ready':
+            self.latest_anomaly = None
+
+    def refresh(self):
+        sample = self.latest_sample
+
+        for name, device, field, _, value_format in LiveReadoutFrame.READOUTS:
+            reading = getattr(sample, device) if sample else None
+            value = getattr(reading, field) if reading else None
+            self.show(self.value_labels[name], name, value_format.format(value) if isinstance(value, (int, float)) else '-')
+
+        for name, device in LiveReadoutFrame.DEVICES:
+            state = self.device_states[device]
+            if state == 'connected' and sample and getattr(sample, device) is None:
+                state = 'no response'
+            self.show(self.state_labels[device], device, f'{name}: {state}', text_color=self.state_colour(state))
+
+        anomaly = self.latest_anomaly
+        if anomaly:
+            self.show(self.anomaly_label, 'anomaly', f'{anomaly.time:%H:%M:%S} {anomaly.name}: {anomaly.detail}', text_color=App.COLOUR_BRIGHT_ORANGE)
+        else:
+            self.show(self.anomaly_label, 'anomaly', 'No anomalies', text_color=App.COLOUR_GREY)
+
+        self.after(self.refresh_ms, self.refresh)
+
+    def state_colour(self, state):
+        if state == 'connected':
+            return App.COLOUR_BRIGHT_GREEN
+        if state in ('no response', 'failed'):
+            return App.COLOUR_BRIGHT_RED
+        if state == 'degraded':
+            return App.COLOUR_BRIGHT_ORANGE
+        if state == 'connecting':
+            return App.COLOUR_BRIGHT_BLUE
+        return App.COLOUR_GREY
+
+    def show(self, label, key, text, **options):
+        # Reconfiguring a widget costs a redraw, so skip it when nothing visible changes
+        if self.shown.get(key) == text:
+            return
+        self.shown[key] = text
+        label.configure(text=text, **options)
 
 
 class App(ctk.CTk):
     MAIN_WIDTH = 640
-    MAIN_HEIGHT = 720
+    MAIN_HEIGHT = 900
+
+    # Fastest the live readings are redrawn, whatever the sample rate
+    READOUT_REFRESH_MS = 250
 
     SECONDARY_WIDTH = 640
     SECONDARY_HEIGHT = 640
@@ -523,8 +858,18 @@ class App(ctk.CTk):
         self.set_parameters()
         self.build_ui()
 
+        # Ports can take seconds to open or time out, so the window is shown first and the devices connect
+        # behind it. The readout panel shows each device connecting, then connected or failed.
+        threading.Thread(
+            target=self.controller.connect_devices,
+            kwargs={'on_state': self.readout_frame.set_device_state},
+            name='connect devices',
+            daemon=True
+        ).start()
+
     def set_parameters(self):
         self.new_experiment_topLevel_window = None
+        self.history_topLevel_window = None
 
         self.detail_entry_values = None
         self.mandatory_entry_values = None
@@ -533,23 +878,44 @@ class App(ctk.CTk):
 
         self.start_time = None
         self.timer_running = False
+        self.replay = None
+        self.run_queue = None
 
         self.current_log_file_name = None
+        self.experiment_log = None
+        self.summary_log = None
+        self.pipeline = SamplePipeline()
+        # Slow drifts (tubing wear, MFC drift, rising cell voltage) are flagged as events while the run goes on
+        if ANOMALY_DETECTION:
+            self.pipeline.add_consumer(AnomalyDetector(data_header(PSU_CHANNELS), on_anomaly=self.log_event))
+        self.catalog = ExperimentCatalog()
+        threading.Thread(target=self.catalog.update, daemon=True).start()
+
+        self.telemetry = None
+        if TELEMETRY_ENABLED:
+            self.telemetry = TelemetryServer()
+            try:
+                self.telemetry.start()
+                self.pipeline.add_consumer(self.telemetry)
+            except OSError as e:
+                logger.error(f'Could not start telemetry server. Error: {e}')
+                self.telemetry = None
+
         self.controller = Controller(self)
 
     def build_ui(self):
         self.title('Data Logger')
         self.geometry(f"{App.MAIN_WIDTH}x{App.MAIN_HEIGHT}")
 
-        # Configure grid layout (5x1)
+        # Configure grid layout (6x1)
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(4, weight=1)
+        self.grid_rowconfigure(5, weight=1)
 
         # ===== Start Experiment Frame =====
         self.start_frame = ctk.CTkFrame(self)
         self.start_frame.grid(row=0, column=0, pady=(0, 20), sticky='ew')
 
-        self.start_frame.grid_rowconfigure((0, 1) , weight=1)
+        self.start_frame.grid_rowconfigure((0, 1, 2) , weight=1)
         self.start_frame.grid_columnconfigure((0, 1, 2), weight=1)
 
         self.start_title = ctk.CTkLabel(self.start_frame, text='Setup Experiment', font=('Futura', 20))
@@ -563,11 +929,68 @@ class App(ctk.CTk):
         )
         self.new_experiment_button.grid(row=1, column=1, padx=5, pady=20, sticky='n')
 
+        self.history_button = ctk.CTkButton(
+            self.start_frame,
+            text='History',
+            width=80,
+            fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+            command=self.open_history_topLevel
+        )
+        self.history_button.grid(row=1, column=0, padx=5, pady=20, sticky='nw')
+
+        # Pre-flight self-test of every device, also run before each experiment
+        self.check_button = ctk.CTkButton(
+            self.start_frame,
+            text='Check',
+            width=80,
+            fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+            command=self.run_preflight
+        )
+        self.check_button.grid(row=1, column=0, padx=5, pady=20, sticky='ne')
+
+        # Unattended runs, back to back from a queue file
+        self.queue_button = ctk.CTkButton(
+            self.start_frame,
+            text='Queue',
+            fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+            command=self.open_run_queue_file
+        )
+        self.queue_button.grid(row=2, column=1, padx=5, pady=(0, 20), sticky='n')
+
+        # Write the serial traffic captured so far to a file, e.g. when a device misbehaves without an error
+        if CAPTURE_ENABLED:
+            self.capture_button = ctk.CTkButton(
+                self.start_frame,
+                text='Capture',
+                width=80,
+                fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+                command=self.dump_serial_capture
+            )
+            self.capture_button.grid(row=2, column=0, padx=5, pady=(0, 20), sticky='ne')
+
+        # Replay a recorded run through the same pipeline as the controller
+        self.replay_speed_options = ctk.CTkOptionMenu(
+            self.start_frame,
+            values=[f'{speed}x' for speed in REPLAY_SPEEDS],
+            width=1
+        )
+        self.replay_speed_options.set(f'{REPLAY_SPEEDS[-1]}x')
+        self.replay_speed_options.grid(row=1, column=2, padx=5, pady=20, sticky='nw')
+
+        self.replay_button = ctk.CTkButton(
+            self.start_frame,
+            text='Replay',
+            width=80,
+            fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE,
+            command=self.open_replay_file
+        )
+        self.replay_button.grid(row=1, column=2, padx=5, pady=20, sticky='ne')
+
         # ===== Control Experiment Frame =====
         self.control_frame = ctk.CTkFrame(self)
         self.control_frame.grid(row=1, column=0, pady=(0, 20), sticky='ew')
 
-        self.control_frame.grid_rowconfigure((0, 1), weight=1)
+        self.control_frame.grid_rowconfigure((0, 1, 2, 3), weight=1)
         self.control_frame.grid_columnconfigure((0, 1, 2), weight=1)
 
         self.control_title = ctk.CTkLabel(self.control_frame, text='Controls', font=('Futura', 20))
@@ -600,6 +1023,31 @@ class App(ctk.CTk):
         )
         self.reset_button.grid(row=1, column=2, padx=5, pady=20, sticky='w')
 
+        # Change a setpoint of the running experiment, logged as an event
+        self.setpoint_options = ctk.CTkOptionMenu(self.control_frame, values=list(SETPOINTS))
+        self.setpoint_options.grid(row=2, column=0, padx=5, pady=(0, 20), sticky='e')
+
+        self.setpoint_entry = ctk.CTkEntry(self.control_frame, placeholder_text='New value')
+        self.setpoint_entry.grid(row=2, column=1, padx=5, pady=(0, 20))
+
+        self.setpoint_button = ctk.CTkButton(
+            self.control_frame,
+            text='Set',
+            fg_color=App.COLOUR_GREY,
+            command=self.change_setpoint,
+            state='disabled'
+        )
+        self.setpoint_button.grid(row=2, column=2, padx=5, pady=(0, 20), sticky='w')
+
+        # Always available: turns every output off ahead of anything else queued on the devices
+        self.emergency_stop_button = ctk.CTkButton(
+            self.control_frame,
+            text='EMERGENCY STOP',
+            fg_color=App.COLOUR_DARK_RED, hover_color=App.COLOUR_BRIGHT_RED,
+            command=self.emergency_stop
+        )
+        self.emergency_stop_button.grid(row=3, column=0, columnspan=3, padx=5, pady=(0, 20), sticky='ew')
+
         # ===== Timer Frame =====
         self.timer_frame = ctk.CTkFrame(self)
         self.timer_frame.grid(row=2, column=0, pady=(0, 20), sticky='ew')
@@ -613,9 +1061,14 @@ class App(ctk.CTk):
         self.timer_textbox = ctk.CTkLabel(self.timer_frame, text='0 hr 0 min')
         self.timer_textbox.grid(row=1, column=0, padx=20, pady=(0, 0), sticky='ew')
 
+        # ===== Live Readout Frame =====
+        self.readout_frame = LiveReadoutFrame(self, refresh_ms=App.READOUT_REFRESH_MS)
+        self.readout_frame.grid(row=3, column=0, pady=(0, 20), sticky='ew')
+        self.pipeline.add_consumer(self.readout_frame)
+
         # ===== Log Frame =====
         self.log_frame = ctk.CTkFrame(self)
-        self.log_frame.grid(row=3, column=0, pady=(0, 20), sticky='ew')
+        self.log_frame.grid(row=4, column=0, pady=(0, 20), sticky='ew')
 
         self.log_frame.grid_rowconfigure((0, 1), weight=1)
         self.log_frame.grid_columnconfigure(0, weight=1)
@@ -628,14 +1081,14 @@ class App(ctk.CTk):
 
         # Add logging to terminal and GUI
         textbox_handler = TextBoxHandler(self.log_textbox)
-        textbox_handler.setLevel(logging.INFO) # Set level to INFO instead of DEBUG for logging window
+        textbox_handler.setLevel(APP_LOG_WINDOW_LEVEL)
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%y-%m-%d %H:%M:%S')
         textbox_handler.setFormatter(formatter)
-        logging.getLogger().addHandler(textbox_handler)
+        add_log_handler(textbox_handler)
 
         # ===== Logo Frame =====
         self.logo_frame = ctk.CTkFrame(self, fg_color='transparent')
-        self.logo_frame.grid(row=4, column=0, sticky='e', padx=10, pady=(0, 10))  # Align right with padding
+        self.logo_frame.grid(row=5, column=0, sticky='e', padx=10, pady=(0, 10))  # Align right with padding
 
         # Load logo with correct aspect ratio
         logo_path = os.path.join(os.path.dirname(__file__), 'images', 'R3VTech_StackLogo_col1.png')
@@ -648,7 +1101,7 @@ class App(ctk.CTk):
         self.logo_label = ctk.CTkLabel(self.logo_frame, image=logo_image, text='')
         self.logo_label.pack()
 
-        logging.info('Program launched successfully!!')
+        logger.info('Program launched successfully!!')
 
     def update_timer(self):
         if self.timer_running and self.start_time:
@@ -660,47 +1113,102 @@ class App(ctk.CTk):
 
     def open_new_experiment_topLevel(self):
         if self.new_experiment_topLevel_window is None or not self.new_experiment_topLevel_window.winfo_exists():
-            logging.info('Setting up new experiment...')
+            logger.info('Setting up new experiment...')
             self.new_experiment_topLevel_window = NewExperimentToplevelWindow(self)
         else:
             self.new_experiment_topLevel_window.focus()
 
-    def set_experiment(self, detail_entry_values, mandatory_entry_values, optional_entry_values, mode_select_values):
-        '''Called by NewExperimentToplevelWindow(object) only'''
+    def run_preflight(self):
+        self.check_button.configure(state='disabled')
+
+        def check():
+            results = self.controller.preflight_check()
+            self.after(0, self.show_preflight, results)
+        threading.Thread(target=check, daemon=True).start()
+
+    def show_preflight(self, results):
+        for result in results.values():
+            self.readout_frame.set_device_state(result.device, 'connected' if result.passed else 'failed')
+        self.check_button.configure(state='normal')
+
+    def dump_serial_capture(self):
+        # SerialCapture.dump logs the file name, which shows in the log window
+        try:
+            dump_capture('Capture button')
+        except OSError as e:
+            logger.error(f'Could not write serial capture. Error: {e}')
+
+    def open_history_topLevel(self):
+        if self.history_topLevel_window is None or not self.history_topLevel_window.winfo_exists():
+            self.history_topLevel_window = HistoryToplevelWindow(self)
+        else:
+            self.history_topLevel_window.focus()
+
+    def set_experiment(self, detail_entry_values, mandatory_entry_values, optional_entry_values, mode_select_values, interlock_rules=None, psu_channels=None):
+        '''
+        Called by NewExperimentToplevelWindow(object) and RunQueue(object) only.
+        Returns False if the experiment could not be set up.
+        '''
         self.detail_entry_values = detail_entry_values
         self.mandatory_entry_values = mandatory_entry_values
         self.optional_entry_values = optional_entry_values
         self.mode_select_values = mode_select_values
 
+        # Nothing is created or started unless every device answers
+        results = self.controller.preflight_check()
+        self.after(0, self.show_preflight, results)
+        if not all(result.passed for result in results.values()):
+            failed = ', '.join(result.device for result in results.values() if not result.passed)
+            logger.error(f'Experiment not started, pre-flight check failed for: {failed}')
+            return False
+
+        # Same name on the same day would overwrite (or on macOS be confused with) an earlier run
+        name = self.catalog.unique_name(datetime.now().date(), self.detail_entry_values[1])
+        if name != self.detail_entry_values[1]:
+            collisions = self.catalog.is_name_taken(datetime.now().date(), self.detail_entry_values[1])
+            logger.warning(f'Experiment name "{self.detail_entry_values[1]}" already used today ({", ".join(collisions)}), logging as "{name}"')
+            self.detail_entry_values = [self.detail_entry_values[0], name, *self.detail_entry_values[2:]]
+
         current_date = datetime.now().strftime('%Y%m%d')
-        self.current_log_file_name = f'output/{current_date}_{self.detail_entry_values[1]}.csv'
-        with open(self.current_log_file_name, 'w', newline='') as file:
-            wr = csv.writer(file, quoting=csv.QUOTE_ALL)
-            wr.writerow(['Author', self.detail_entry_values[0]])
-            wr.writerow(['Experiment name', self.detail_entry_values[1]])
-            wr.writerow([''])
-            wr.writerow(['Parameters'])
-            wr.writerow(['Voltage', self.mandatory_entry_values[0], self.mode_select_values[0]])
-            wr.writerow(['Pump speed', self.mandatory_entry_values[1]])
-            wr.writerow(['Tubing size', self.mandatory_entry_values[2]])
-            wr.writerow(['Pump direction', self.mode_select_values[1]])
-            wr.writerow(['Flow rate', self.mandatory_entry_values[3]])
-            wr.writerow(['Stirrer speed', self.mandatory_entry_values[4]])
-            wr.writerow(['Duration', self.optional_entry_values[0], self.mode_select_values[2]])
-            wr.writerow([''])
-            wr.writerow(['Report'])
-            wr.writerow(['Total power', '', 'W'])
-            wr.writerow(['Total liquid used', '', 'mL'])
-            wr.writerow(['Total gas used', '', 'cm^3'])
-            wr.writerow([''])
-            wr.writerow(['Time', 'Voltage', 'Current', 'Pump speed', 'Flow rate', 'Stirrer speed'])
-
-        logging.info(f'Creating new experiment file: output/{current_date}_{self.detail_entry_values[1]}.csv')
+        self.current_log_file_name = f'output/{current_date}_{self.detail_entry_values[1]}'
+        header_rows = [
+            ['Author', self.detail_entry_values[0]],
+            ['Experiment name', self.detail_entry_values[1]],
+            [''],
+            ['Parameters'],
+            ['Voltage', self.mandatory_entry_values[0], self.mode_select_values[0]],
+            *[
+                [f'Voltage {channel}', config['value'], config.get('unit', self.mode_select_values[0])]
+                for channel, config in enumerate(psu_channels or [], start=2)
+            ],
+            ['Pump speed', self.mandatory_entry_values[1]],
+            ['Tubing size', self.mandatory_entry_values[2]],
+            ['Pump direction', self.mode_select_values[1]],
+            ['Flow rate', self.mandatory_entry_values[3]],
+            ['Stirrer speed', self.mandatory_entry_values[4]],
+            ['Duration', self.optional_entry_values[0], self.mode_select_values[2]],
+            [''],
+            ['Report'],
+            ['Total power', '', 'W'],
+            ['Total liquid used', '', 'mL'],
+            ['Total gas used', '', 'cm^3'],
+            [''],
+            data_header(PSU_CHANNELS)
+        ]
+        self.experiment_log = create_experiment_log(self.current_log_file_name)
+        self.experiment_log.write_header(header_rows)
+        self.open_summary_log(header_rows[-1])
+
+        logger.info(f'Creating new experiment log: {self.current_log_file_name} ({LOG_MODE})')
 
         # Setup controller and run in thread
         psu_config={
             'value': self.mandatory_entry_values[0],
-            'mode': self.mode_select_values[0]
+            'mode': self.mode_select_values[0],
+            'channels': [
+                {'value': config['value'], 'mode': config.get('unit', self.mode_select_values[0])}
+                for config in psu_channels or []
+            ]
         }
         pump_config={
             'speed': self.mandatory_entry_values[1],
@@ -716,20 +1224,173 @@ class App(ctk.CTk):
             'time': self.optional_entry_values[0],
             'unit': self.mode_select_values[2]
         }
-        threading.Thread(target=self.controller.run, args=(psu_config, pump_config, mfc_config, stirrer_config, duration_config), daemon=True).start()
+        threading.Thread(target=self.controller.run, args=(psu_config, pump_config, mfc_config, stirrer_config, duration_config, interlock_rules), daemon=True).start()
 
         self.enable_start_button()
         self.disable_stop_button()
         self.enable_reset_button()
+        self.enable_setpoint_button()
         self.disable_new_experiment_button()
+        self.disable_replay_button()
 
-    def log_experiment_data(self, psu_readings, pump_readings, mfc_readings):
-        '''Called by the Controller(object) only'''
-        current_time = datetime.now().strftime('%H:%M:%S')
-        with open(self.current_log_file_name, 'a', newline='') as file:
-            wr = csv.writer(file, quoting=csv.QUOTE_ALL)
-            wr.writerow([current_time, psu_readings['voltage'], psu_readings['current'], 'S', mfc_readings, 'P'])
+        self.pipeline.publish_state('ready', experiment=self.detail_entry_values[1], author=self.detail_entry_values[0])
+        return True
+
+    def open_run_queue_file(self):
+        file_name = filedialog.askopenfilename(
+            title='Run queue',
+            initialdir=RUN_QUEUE_DIRECTORY if os.path.isdir(RUN_QUEUE_DIRECTORY) else '.',
+            filetypes=[('Run queues', '*.json')]
+        )
+        if file_name:
+            self.start_run_queue(file_name)
 
+    def start_run_queue(self, file_name):
+        # Every run is checked before the first one starts, so a mistake does not stop the queue overnight
+        try:
+            runs = load_run_queue(file_name)
+        except Exception as e:
+            logger.error(f'Could not load run queue {file_name}. Error: {e}')
+            return
+
+        self.disable_new_experiment_button()
+        self.disable_replay_button()
+        self.queue_button.configure(fg_color=App.COLOUR_GREY, state='disabled')
+
+        self.run_queue = RunQueue(self, runs, on_finished=lambda: self.after(0, self.run_queue_complete))
+        self.pipeline.publish_state('queue', file=file_name, runs=len(runs))
+        self.run_queue.start()
+
+    def run_queue_complete(self):
+        self.run_queue = None
+        self.queue_button.configure(fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE, state='normal')
+        # A queue stopped part way leaves its run loaded, it is reset by hand as usual
+        if not self.experiment_log:
+            self.enable_new_experiment_button()
+            self.enable_replay_button()
+
+    def stop_run_queue(self, reason):
+        if self.run_queue:
+            logger.warning(f'Stopping run queue: {reason}')
+            self.run_queue.stop()
+
+    def open_replay_file(self):
+        file_name = filedialog.askopenfilename(
+            title='Replay experiment',
+            initialdir='output',
+            filetypes=[('Experiment logs', '*.csv *.manifest.json')]
+        )
+        if file_name:
+            self.start_replay(file_name, speed=float(self.replay_speed_options.get().rstrip('x')))
+
+    def start_replay(self, file_name, speed):
+        try:
+            self.replay = Replay(file_name, on_sample=self.log_experiment_data, speed=speed,
+                                 on_finished=lambda: self.after(0, self.replay_complete), on_event=self.log_event)
+        except Exception as e:
+            logger.error(f'Could not open {file_name} for replay. Error: {e}')
+            self.replay = None
+            return
+
+        # Log the replayed run like a live one, under its own name
+        experiment = self.replay.experiment
+        current_date = datetime.now().strftime('%Y%m%d')
+        self.current_log_file_name = f'output/{current_date}_{experiment.name}-replay'
+        self.experiment_log = create_experiment_log(self.current_log_file_name)
+        self.experiment_log.write_header(experiment.header_rows[:-1] + [data_header(psu_channel_count(experiment.columns))])
+        self.open_summary_log(data_header(psu_channel_count(experiment.columns)))
+
+        self.disable_new_experiment_button()
+        self.disable_replay_button()
+        self.disable_start_button()
+        self.disable_stop_button()
+        self.enable_reset_button()
+
+        self.start_time = datetime.now()
+        self.timer_running = True
+        self.update_timer()
+
+        self.pipeline.publish_state('replay', experiment=experiment.name, author=experiment.author, speed=speed)
+        self.replay.start()
+
+    def replay_complete(self):
+        '''Replay thread finished, either at the end of the file or after a reset'''
+        if self.replay:
+            self.replay = None
+            self.reset_experiment()
+        self.enable_new_experiment_button()
+        self.enable_replay_button()
+
+    def log_experiment_data(self, sample):
+        '''Called by the Controller(object) and Replay(object) only'''
+        if self.experiment_log:
+            self.experiment_log.write_sample(sample)
+        self.pipeline.publish_sample(sample)
+
+    def open_summary_log(self, header):
+        if not SUMMARY_WINDOWS:
+            return
+        try:
+            self.summary_log = SummaryLog(self.current_log_file_name, header)
+        except OSError as e:
+            logger.error(f'Could not create summary log. Error: {e}')
+            return
+        self.pipeline.add_consumer(self.summary_log)
+
+    def close_summary_log(self):
+        if self.summary_log:
+            self.pipeline.remove_consumer(self.summary_log)
+            self.summary_log.close()
+            logger.info(f'Summary log written: {", ".join(self.summary_log.file_names)}')
+            self.summary_log = None
+
+    def log_event(self, event):
+        '''Called by the Controller(object), AnomalyDetector(object) and Replay(object) only'''
+        if self.experiment_log:
+            self.experiment_log.write_event(event)
+        self.pipeline.publish_event(event)
+
+    def change_setpoint(self):
+        setpoint = self.setpoint_options.get()
+        text = self.setpoint_entry.get().strip()
+        if setpoint == 'Pump direction':
+            value = text
+        else:
+            try:
+                value = float(text)
+            except ValueError:
+                logger.error(f'Invalid {setpoint.lower()}: "{text}"')
+                return
+
+        # Waits for the device to answer, so keep it off the GUI thread
+        def send():
+            try:
+                self.controller.change_setpoint(setpoint, value)
+            except Exception as e:
+                logger.error(f'Could not change {setpoint.lower()}. Error: {e}')
+        threading.Thread(target=send, daemon=True).start()
+        self.setpoint_entry.delete(0, 'end')
+
+
+    def device_health_changed(self, device, state):
+        '''Called by the Controller(object) only, when a device is degraded or recovers'''
+        self.readout_frame.set_device_state(device, 'connected' if state == 'healthy' else state)
+
+    def experiment_finished(self):
+        '''Called by the Controller(object) only, once the run has lasted its duration'''
+        self.pipeline.publish_state('finished')
+        # Controller thread, so hand the button changes to the GUI thread
+        self.after(0, self.stop_experiment)
+        if self.run_queue:
+            self.run_queue.run_finished()
+
+    def interlock_tripped(self, trip):
+        '''Called by the Controller(object) only, after it has acted on the trip'''
+        self.pipeline.publish_state('interlock', rule=trip.rule, message=trip.message, action=trip.action)
+        if trip.action == 'shutdown':
+            self.stop_run_queue(f'interlock {trip.rule} tripped')
+            # Controller thread, so hand the button changes to the GUI thread
+            self.after(0, self.stop_experiment)
 
     def enable_new_experiment_button(self):
         self.new_experiment_button.configure(fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE, state='normal')
@@ -737,6 +1398,12 @@ class App(ctk.CTk):
     def disable_new_experiment_button(self):
         self.new_experiment_button.configure(fg_color=App.COLOUR_GREY, state='disabled')
 
+    def enable_replay_button(self):
+        self.replay_button.configure(fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE, state='normal')
+
+    def disable_replay_button(self):
+        self.replay_button.configure(fg_color=App.COLOUR_GREY, state='disabled')
+
     def enable_start_button(self):
         self.start_button.configure(fg_color=App.COLOUR_BRIGHT_GREEN, hover_color=App.COLOUR_DARK_GREEN, state='normal')
 
@@ -755,6 +1422,12 @@ class App(ctk.CTk):
     def disable_reset_button(self):
         self.reset_button.configure(fg_color=App.COLOUR_GREY, state='disabled')
 
+    def enable_setpoint_button(self):
+        self.setpoint_button.configure(fg_color=App.COLOUR_BRIGHT_BLUE, hover_color=App.COLOUR_DARK_BLUE, state='normal')
+
+    def disable_setpoint_button(self):
+        self.setpoint_button.configure(fg_color=App.COLOUR_GREY, state='disabled')
+
     def start_experiment(self):
         self.disable_new_experiment_button()
         self.disable_start_button()
@@ -766,8 +1439,16 @@ class App(ctk.CTk):
         self.update_timer()
 
         current_time = datetime.now().strftime('%H:%M:%S')
-        logging.info(f'Experiment started at: {current_time}')
+        logger.info(f'Experiment started at: {current_time}')
         self.controller.start()
+        self.pipeline.publish_state('running')
+
+    def emergency_stop(self):
+        self.stop_run_queue('emergency stop')
+        # Waits on the devices, so keep it off the GUI thread
+        threading.Thread(target=self.controller.emergency_stop, daemon=True).start()
+        if self.timer_running:
+            self.stop_experiment()
 
     def stop_experiment(self):
         self.disable_new_experiment_button()
@@ -778,8 +1459,9 @@ class App(ctk.CTk):
         self.timer_running = False
 
         current_time = datetime.now().strftime('%H:%M:%S')
-        logging.info(f'Experiment stopped at: {current_time}')
+        logger.info(f'Experiment stopped at: {current_time}')
         self.controller.stop()
+        self.pipeline.publish_state('stopped')
 
     def reset_complete(self):
         '''
@@ -787,29 +1469,61 @@ class App(ctk.CTk):
         exit the while loop. 
         So wait until the it exits, the only enable the user to start a new experiment.
         '''
+        if self.run_queue:
+            # The queue sets up the next run itself, the buttons come back once it has finished
+            self.run_queue.reset_complete()
+            return
         self.enable_new_experiment_button()
+        self.enable_replay_button()
 
     def reset_experiment(self):
         self.disable_start_button()
         self.disable_stop_button()
         self.disable_reset_button()
+        self.disable_setpoint_button()
 
         self.timer_running = False
         self.start_time = None
         self.timer_textbox.configure(text='0 hr 0 min')
 
         self.current_log_file_name = None
+        self.close_summary_log()
+        if self.experiment_log:
+            finished_log = self.experiment_log
+            self.experiment_log = None
+
+            # Closing may wait on chunk compression, so finish the log and index it off the GUI thread
+            def finish_log():
+                finished_log.close()
+                self.catalog.add_run(finished_log.file_name)
+                # Convert for the history view now, so the run opens straight away later
+                if is_experiment_log(finished_log.file_name):
+                    try:
+                        prepare_history(finished_log.file_name)
+                    except Exception as e:
+                        logger.warning(f'Could not prepare history of {finished_log.file_name}. Error: {e}')
+            threading.Thread(target=finish_log, daemon=True).start()
 
         current_time = datetime.now().strftime('%H:%M:%S')
-        logging.info(f'Experiment reset at: {current_time}')
-        self.controller.reset()
+        logger.info(f'Experiment reset at: {current_time}')
+        if self.replay:
+            # The replay thread calls replay_complete once it has stopped
+            self.replay.stop()
+            self.replay = None
+        else:
+            self.controller.reset()
+        self.pipeline.publish_state('reset')
 
 
 def main():
     pass
 
 if __name__ == '__main__':
-    print('Starting up the GUI... ')
-
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    setup_logging()
+    logger.info('Starting up the GUI... ')
+
+    try:
+        app = App()
+        app.mainloop()
+    finally:
+        stop_logging()
\ No newline at end of file
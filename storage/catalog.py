@@ -0,0 +1,292 @@
+import os
+import glob
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from storage.experiment_file import ExperimentFile, is_experiment_log, to_float
+from storage.segmented_log import MANIFEST_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE_NAME = 'catalog.db'
+
+# Header parameters stored as columns of the runs table, so they can be filtered with an index
+PARAMETER_COLUMNS = {
+    'Voltage': 'voltage',
+    'Pump speed': 'pump_speed',
+    'Tubing size': 'tubing_size',
+    'Pump direction': 'pump_direction',
+    'Flow rate': 'flow_rate',
+    'Stirrer speed': 'stirrer_speed',
+    'Duration': 'duration'
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    run_date TEXT,
+    name TEXT,
+    name_key TEXT,
+    author TEXT,
+    voltage REAL,
+    voltage_unit TEXT,
+    pump_speed REAL,
+    tubing_size REAL,
+    pump_direction TEXT,
+    flow_rate REAL,
+    stirrer_speed REAL,
+    duration REAL,
+    duration_unit TEXT,
+    samples INTEGER,
+    first_time TEXT,
+    last_time TEXT
+);
+CREATE TABLE IF NOT EXISTS run_stats (
+    path TEXT REFERENCES runs(path) ON DELETE CASCADE,
+    channel TEXT,
+    count INTEGER,
+    mean REAL,
+    min REAL,
+    max REAL,
+    PRIMARY KEY (path, channel)
+);
+CREATE INDEX IF NOT EXISTS runs_author ON runs(author, run_date);
+CREATE INDEX IF NOT EXISTS runs_date ON runs(run_date);
+CREATE INDEX IF NOT EXISTS runs_flow_rate ON runs(flow_rate);
+CREATE INDEX IF NOT EXISTS runs_name_key ON runs(run_date, name_key);
+'''
+
+
+def name_key(name):
+    '''
+    Names that end up as the same file are treated as the same experiment: only case is ignored
+    (macOS file systems are case-insensitive), so 'Test1' and 'test1' collide but 'test-1' does not.
+    '''
+    return (name or '').casefold()
+
+
+def log_base_name(file_name):
+    '''output/20250723_test.csv -> 20250723_test, as the log of any mode is named'''
+    base_name = os.path.basename(file_name)
+    for suffix in (MANIFEST_SUFFIX, '.csv'):
+        base_name = base_name.removesuffix(suffix)
+    return base_name
+
+
+class ExperimentCatalog:
+    '''
+    SQLite index of the experiment logs in the output directory.
+
+    Holds each run's header metadata and per-channel summary statistics. update() only re-reads
+    files whose size or modification time changed, and add_run() indexes a single run as it finishes.
+    '''
+    def __init__(self, directory='output', db_name=None):
+        self.directory = directory
+        self.db_name = db_name or os.path.join(directory, CATALOG_FILE_NAME)
+
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        # A new connection per call so the catalog can be used from any thread
+        connection = sqlite3.connect(self.db_name)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA foreign_keys = ON')
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def update(self):
+        '''Index new and changed runs and drop runs whose file has been deleted. Returns the number of runs re-read.'''
+        file_names = [
+            file_name for file_name in glob.glob(os.path.join(self.directory, '*'))
+            if is_experiment_log(file_name)
+        ]
+
+        with self.connect() as connection:
+            known = {row['path']: (row['mtime'], row['size']) for row in connection.execute('SELECT path, mtime, size FROM runs')}
+
+            updated = 0
+            for file_name in file_names:
+                stat = os.stat(file_name)
+                if known.get(file_name) != (stat.st_mtime, stat.st_size):
+                    self.index_run(connection, file_name, stat)
+                    updated += 1
+
+            removed = set(known) - set(file_names)
+            connection.executemany('DELETE FROM runs WHERE path = ?', [(path,) for path in removed])
+
+        logger.debug(f'Catalog updated: {updated} run(s) indexed, {len(removed)} removed.')
+        return updated
+
+    def add_run(self, file_name):
+        # Runs kept in the sample database have no log file of their own to index
+        if not is_experiment_log(file_name):
+            return
+        with self.connect() as connection:
+            self.index_run(connection, file_name, os.stat(file_name))
+
+    def index_run(self, connection, file_name, stat):
+        try:
+            with ExperimentFile(file_name) as experiment:
+                stats, samples, first_time, last_time = summarise(experiment)
+        except Exception as e:
+            logger.warning(f'Could not index {file_name}. Error: {e}')
+            return
+
+        run = {
+            'path': file_name,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'run_date': experiment.date.isoformat() if experiment.date else None,
+            'name': experiment.name,
+            'name_key': name_key(experiment.name),
+            'author': experiment.author,
+            'voltage_unit': experiment.header['Parameters'].get('Voltage', (None, None))[1],
+            'duration_unit': experiment.header['Parameters'].get('Duration', (None, None))[1],
+            'samples': samples,
+            'first_time': first_time,
+            'last_time': last_time
+        }
+        for parameter, column in PARAMETER_COLUMNS.items():
+            run[column] = experiment.parameter(parameter)
+
+        columns = ', '.join(run)
+        placeholders = ', '.join(f':{column}' for column in run)
+        connection.execute('DELETE FROM runs WHERE path = ?', (file_name,))
+        connection.execute(f'INSERT INTO runs ({columns}) VALUES ({placeholders})', run)
+        connection.executemany(
+            'INSERT INTO run_stats (path, channel, count, mean, min, max) VALUES (?, ?, ?, ?, ?, ?)',
+            [(file_name, channel, *values) for channel, values in stats.items()]
+        )
+
+    def find_runs(self, author=None, name=None, since=None, until=None, **ranges):
+        '''
+        Runs matching every given filter, newest first.
+
+        since/until are dates (or 'YYYY-MM-DD'), ranges are min_<column>/max_<column> on the
+        numeric parameter columns, e.g. find_runs(author='cf', min_flow_rate=80, since=date.today() - timedelta(days=30))
+        '''
+        conditions = []
+        values = []
+
+        if author is not None:
+            conditions.append('author = ? COLLATE NOCASE')
+            values.append(author)
+        if name is not None:
+            conditions.append('name_key = ?')
+            values.append(name_key(name))
+        if since is not None:
+            conditions.append('run_date >= ?')
+            values.append(str(since))
+        if until is not None:
+            conditions.append('run_date <= ?')
+            values.append(str(until))
+
+        for key, value in ranges.items():
+            bound, _, column = key.partition('_')
+            if bound not in ('min', 'max') or column not in PARAMETER_COLUMNS.values():
+                raise ValueError(f'Unknown filter: {key}')
+            conditions.append(f'{column} {">=" if bound == "min" else "<="} ?')
+            values.append(value)
+
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        with self.connect() as connection:
+            rows = connection.execute(f'SELECT * FROM runs {where} ORDER BY run_date DESC, path', values)
+            return [dict(row) for row in rows]
+
+    def get_stats(self, file_name):
+        with self.connect() as connection:
+            rows = connection.execute('SELECT channel, count, mean, min, max FROM run_stats WHERE path = ?', (file_name,))
+            return {row['channel']: dict(row) for row in rows}
+
+    def name_collisions(self):
+        '''Groups of runs on the same day whose experiment names are the same once case is ignored'''
+        with self.connect() as connection:
+            rows = connection.execute(
+                '''SELECT run_date, name_key, GROUP_CONCAT(path, '|') AS paths FROM runs
+                   WHERE run_date IS NOT NULL
+                   GROUP BY run_date, name_key HAVING COUNT(*) > 1
+                   ORDER BY run_date'''
+            )
+            return [(row['run_date'], row['paths'].split('|')) for row in rows]
+
+    def is_name_taken(self, run_date, name):
+        '''
+        Paths of runs on run_date that would collide with a new experiment called name. Logs on disk
+        are checked as well as the index, which may not have caught up with them yet.
+        '''
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT path FROM runs WHERE run_date = ? AND name_key = ?',
+                (str(run_date), name_key(name))
+            )
+            paths = [row['path'] for row in rows]
+
+        key = name_key(f'{date.fromisoformat(str(run_date)):%Y%m%d}_{name}')
+        if os.path.isdir(self.directory):
+            for entry in sorted(os.listdir(self.directory)):
+                path = os.path.join(self.directory, entry)
+                if name_key(log_base_name(entry)) == key and path not in paths:
+                    paths.append(path)
+        return paths
+
+    def unique_name(self, run_date, name, used=()):
+        '''name, or name_2, name_3, ... if it is taken on run_date or in used, so a run never overwrites another'''
+        candidate = name
+        number = 2
+        taken = {name_key(used_name) for used_name in used}
+        while name_key(candidate) in taken or self.is_name_taken(run_date, candidate):
+            candidate = f'{name}_{number}'
+            number += 1
+        return candidate
+
+
+def summarise(experiment):
+    '''Per-channel count, mean, min and max of the numeric columns, in a single pass over the data rows'''
+    channels = experiment.columns[1:]
+    totals = {channel: [0, 0.0, None, None] for channel in channels}
+    samples = 0
+    first_time = None
+    last_time = None
+
+    for row in experiment.data_rows():
+        if not row:
+            continue
+        samples += 1
+        first_time = first_time or row[0]
+        last_time = row[0]
+
+        for channel, cell in zip(channels, row[1:]):
+            value = to_float(cell)
+            if value is None:
+                continue
+            total = totals[channel]
+            total[0] += 1
+            total[1] += value
+            total[2] = value if total[2] is None else min(total[2], value)
+            total[3] = value if total[3] is None else max(total[3], value)
+
+    stats = {
+        channel: (count, value_sum / count, minimum, maximum)
+        for channel, (count, value_sum, minimum, maximum) in totals.items() if count
+    }
+    return stats, samples, first_time, last_time
+
+
+if __name__ == '__main__':
+    catalog = ExperimentCatalog()
+    catalog.update()
+
+    for run in catalog.find_runs(since=date.today() - timedelta(days=30)):
+        print(f'{run["run_date"]}  {run["name"]:<20} {run["author"]:<10} flow={run["flow_rate"]}  samples={run["samples"]}')
+
+    for run_date, paths in catalog.name_collisions():
+        print(f'Name collision on {run_date}: {", ".join(paths)}')
@@ -0,0 +1,211 @@
+import math
+from datetime import timedelta
+
+from storage.experiment_file import ExperimentFile, to_float, timed_rows
+
+# Decisions of a channel for a new sample
+KEEP_NONE = 0
+KEEP_PREVIOUS = 1
+KEEP_CURRENT = 2
+
+
+class ExactChannel:
+    '''Channels without a tolerance (text, flags, setpoints) are logged whenever they change'''
+    __slots__ = ('last',)
+
+    def __init__(self):
+        self.last = None
+
+    def check(self, t, value):
+        return KEEP_CURRENT if value != self.last else KEEP_NONE
+
+    def archive(self, t, value):
+        self.last = value
+
+
+class DeadbandChannel:
+    '''Logged when the value moves more than tolerance away from the last logged value'''
+    __slots__ = ('tolerance', 'last')
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.last = None
+
+    def check(self, t, value):
+        if value is None or self.last is None:
+            return KEEP_CURRENT if value != self.last else KEEP_NONE
+        return KEEP_CURRENT if abs(value - self.last) > self.tolerance else KEEP_NONE
+
+    def archive(self, t, value):
+        self.last = value
+
+
+class SwingingDoorChannel:
+    '''
+    Swinging-door trending: the doors pivot tolerance above and below the last logged point and
+    narrow to the slopes of the lines passing within tolerance of every sample since. A sample can
+    only be dropped while the line from the logged point to the next sample stays between the doors,
+    so the previous sample is logged (and becomes the new pivot) as soon as a sample falls outside them.
+    A linear interpolation between logged points is then within tolerance of every dropped sample.
+    '''
+    __slots__ = ('tolerance', 'last_t', 'last', 'upper_slope', 'lower_slope')
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.last_t = None
+        self.last = None
+        self.upper_slope = -math.inf
+        self.lower_slope = math.inf
+
+    def check(self, t, value):
+        if value is None or self.last is None:
+            return KEEP_CURRENT if value != self.last else KEEP_NONE
+
+        elapsed = t - self.last_t
+        if elapsed <= 0:
+            return KEEP_CURRENT if abs(value - self.last) > self.tolerance else KEEP_NONE
+
+        # The doors only hold the samples before this one, a line ending on it must pass all of them
+        if not self.upper_slope <= (value - self.last) / elapsed <= self.lower_slope:
+            return KEEP_PREVIOUS
+
+        self.upper_slope = max(self.upper_slope, (value - self.last - self.tolerance) / elapsed)
+        self.lower_slope = min(self.lower_slope, (value - self.last + self.tolerance) / elapsed)
+        return KEEP_NONE
+
+    def archive(self, t, value):
+        self.last_t = t
+        self.last = value
+        self.upper_slope = -math.inf
+        self.lower_slope = math.inf
+
+
+CHANNEL_TYPES = {
+    'deadband': DeadbandChannel,
+    'swinging_door': SwingingDoorChannel
+}
+
+
+class CompressedLog:
+    '''
+    Wraps an experiment log and only passes on the samples needed to rebuild the run within
+    the tolerance of each channel, plus a heartbeat row when nothing has been logged for a while.
+
+    Swinging-door compression may need the sample before the current one, so the latest sample is
+    held back until the next one arrives (or the log is closed).
+    '''
+    def __init__(self, log, method, tolerances, heartbeat_seconds):
+        if method not in CHANNEL_TYPES:
+            raise ValueError(f'Unknown log compression "{method}"')
+        self.log = log
+        self.file_name = log.file_name
+        self.method = method
+        self.tolerances = tolerances
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self.channels = []
+        self.pending = None
+        self.pending_logged = True
+        self.last_logged_t = None
+
+    def write_header(self, header_rows):
+        header_rows = [list(row) for row in header_rows]
+        data_header = header_rows[-1]
+
+        # Time is not compressed, every other column gets a channel
+        self.channels = [
+            CHANNEL_TYPES[self.method](self.tolerances[column]) if column in self.tolerances else ExactChannel()
+            for column in data_header[1:]
+        ]
+
+        # Tell readers how the rows were thinned out, right after the experiment name
+        header_rows.insert(2, ['Compression', self.method, self.heartbeat_seconds])
+        self.log.write_header(header_rows)
+
+    def write_sample(self, sample):
+        # Rows are logged to the second, the tolerance holds for a run rebuilt from the logged times
+        t = sample.time.replace(microsecond=0).timestamp()
+        values = [None if cell == '' else cell for cell in sample.to_row()[1:]]
+
+        decision = self.check(t, values)
+        if decision == KEEP_PREVIOUS and not self.pending_logged:
+            self.keep(*self.pending)
+            decision = self.check(t, values)
+
+        heartbeat_due = self.last_logged_t is None or t - self.last_logged_t >= self.heartbeat_seconds
+        self.pending = (sample, t, values)
+        self.pending_logged = False
+        if decision != KEEP_NONE or heartbeat_due:
+            self.keep(sample, t, values)
+
+    def check(self, t, values):
+        decision = KEEP_NONE
+        for channel, value in zip(self.channels, values):
+            decision = max(decision, channel.check(t, value))
+        return decision
+
+    def keep(self, sample, t, values):
+        self.log.write_sample(sample)
+        for channel, value in zip(self.channels, values):
+            channel.archive(t, value)
+        self.last_logged_t = t
+        self.pending_logged = True
+
+    def write_event(self, event):
+        # The sample held back is logged first, so the run is known up to the moment of the event
+        if self.pending is not None and not self.pending_logged:
+            self.keep(*self.pending)
+        self.log.write_event(event)
+
+    def close(self):
+        # The last sample is always logged so the run ends where it really ended
+        if self.pending is not None and not self.pending_logged:
+            self.keep(*self.pending)
+        self.log.close()
+
+
+def read_uniform(file_name, interval_seconds, method=None):
+    '''
+    Rebuild a compressed (or any) experiment log on a uniform time grid.
+
+    Yields data rows every interval_seconds from the first to the last logged row. Numeric
+    columns are linearly interpolated for swinging-door logs and held at the last logged value
+    otherwise (deadband), text columns are always held.
+    '''
+    with ExperimentFile(file_name) as experiment:
+        if method is None:
+            method = 'linear' if experiment.header.get('Compression') == 'swinging_door' else 'hold'
+
+        previous = None
+        grid_time = None
+        for current in timed_rows(experiment.data_rows()):
+            if previous is None:
+                previous = current
+                grid_time = current[0]
+                continue
+
+            while grid_time <= current[0]:
+                yield interpolate(previous, current, grid_time, method)
+                grid_time += timedelta(seconds=interval_seconds)
+            previous = current
+
+        if previous is not None and grid_time is not None and grid_time <= previous[0]:
+            yield interpolate(previous, previous, grid_time, method)
+
+
+def interpolate(previous, current, grid_time, method):
+    (t0, cells0), (t1, cells1) = previous, current
+    if grid_time >= t1:
+        return [grid_time.strftime('%H:%M:%S')] + list(cells1)
+
+    span = (t1 - t0).total_seconds()
+    fraction = (grid_time - t0).total_seconds() / span if span else 0.0
+
+    row = [grid_time.strftime('%H:%M:%S')]
+    for cell0, cell1 in zip(cells0, cells1):
+        value0, value1 = to_float(cell0), to_float(cell1)
+        if method == 'linear' and value0 is not None and value1 is not None:
+            row.append(value0 + (value1 - value0) * fraction)
+        else:
+            row.append(cell0)
+    return row
@@ -0,0 +1,40 @@
+import csv
+import threading
+
+
+class CsvLog:
+    '''Single CSV file holding the experiment header followed by one row per sample'''
+    def __init__(self, base_name):
+        self.file_name = f'{base_name}.csv'
+        self.lock = threading.Lock()
+        self.file = None
+        self.writer = None
+
+    def write_header(self, header_rows):
+        with self.lock:
+            self.file = open(self.file_name, 'w', newline='')
+            self.writer = csv.writer(self.file, quoting=csv.QUOTE_ALL)
+            self.writer.writerows(header_rows)
+            self.file.flush()
+
+    def write_sample(self, sample):
+        row = sample.to_row()
+        with self.lock:
+            if self.file is None:
+                return
+            self.writer.writerow(row)
+            self.file.flush()
+
+    def write_event(self, event):
+        row = event.to_row()
+        with self.lock:
+            if self.file is None:
+                return
+            self.writer.writerow(row)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,135 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+from storage.experiment_log import read_experiment_log
+from storage.segmented_log import MANIFEST_SUFFIX
+
+# Experiment logs are named output/YYYYMMDD_<experiment name>.csv (or .manifest.json when segmented)
+FILE_NAME_PATTERN = re.compile(r'^(\d{8})_(.*?)(\.csv|\.manifest\.json)$')
+
+# Second cell of a data row that records an event (e.g. a setpoint change) rather than a sample:
+# time, 'Event', kind, name, value, unit, detail
+EVENT_MARKER = 'Event'
+
+
+def to_float(value):
+    '''Numeric cell value, or None for empty and placeholder cells'''
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_file_name(file_name):
+    '''Returns (run date, experiment name) from the log file name, or (None, None) if it does not match'''
+    match = FILE_NAME_PATTERN.match(os.path.basename(file_name))
+    if not match:
+        return None, None
+    try:
+        run_date = datetime.strptime(match.group(1), '%Y%m%d').date()
+    except ValueError:
+        return None, match.group(2)
+    return run_date, match.group(2)
+
+
+def timed_rows(rows, run_date=None):
+    '''
+    (datetime, cells) for every data row. Times are HH:MM:SS on run_date (1900-01-01 if unknown)
+    and roll over to the next day whenever they go backwards.
+    '''
+    day = datetime.combine(run_date, datetime.min.time()) if run_date else datetime(1900, 1, 1)
+    last_time = None
+    for row in rows:
+        if not row:
+            continue
+        # Split by hand, strptime is most of the cost of reading a long run
+        hour, minute, second = row[0].split(':')
+        time = day.replace(hour=int(hour), minute=int(minute), second=int(second))
+        if last_time is not None and time < last_time:
+            day += timedelta(days=1)
+            time += timedelta(days=1)
+        last_time = time
+        yield time, row[1:]
+
+
+def is_event_row(row):
+    return len(row) > 1 and row[1] == EVENT_MARKER
+
+
+def is_experiment_log(file_name):
+    return file_name.endswith('.csv') or file_name.endswith(MANIFEST_SUFFIX)
+
+
+class ExperimentFile:
+    '''
+    Reads an experiment log written by App: the Author/Parameters/Report header blocks,
+    then a 'Time' column header and the data rows.
+
+    header holds 'Author', 'Experiment name', and the 'Parameters' and 'Report' sections
+    as {name: (value, unit)} with value converted to float where possible.
+    '''
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.date, self.name = parse_file_name(file_name)
+        self.header = {'Author': None, 'Experiment name': None, 'Parameters': {}, 'Report': {}}
+        self.header_rows = []
+        self.columns = []
+        # Event rows met so far in the data section
+        self.events = []
+
+        self.rows = read_experiment_log(file_name)
+        self.read_header()
+
+        if self.header['Experiment name']:
+            self.name = self.header['Experiment name']
+
+    def read_header(self):
+        section = None
+        for row in self.rows:
+            self.header_rows.append(row)
+            if not row or not row[0]:
+                section = None
+                continue
+
+            key = row[0]
+            if key == 'Time':
+                self.columns = row
+                return
+            elif key in ('Parameters', 'Report'):
+                section = key
+            elif section:
+                value = row[1] if len(row) > 1 else ''
+                unit = row[2] if len(row) > 2 else None
+                numeric = to_float(value)
+                self.header[section][key] = (numeric if numeric is not None or value == '' else value, unit)
+            else:
+                self.header[key] = row[1] if len(row) > 1 else ''
+
+    @property
+    def author(self):
+        return self.header['Author']
+
+    def parameter(self, name):
+        return self.header['Parameters'].get(name, (None, None))[0]
+
+    def data_rows(self, include_events=False):
+        '''
+        Remaining sample rows of the data section, streamed from disk. Can only be iterated once.
+        Event rows are collected in events as they are passed, and only yielded with include_events.
+        '''
+        for row in self.rows:
+            if is_event_row(row):
+                self.events.append(row)
+                if not include_events:
+                    continue
+            yield row
+
+    def close(self):
+        self.rows.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,35 @@
+import csv
+
+from storage.csv_log import CsvLog
+from storage.segmented_log import SegmentedLog, MANIFEST_SUFFIX, read_segmented_log
+from storage.sqlite_log import SqliteLog
+from constants.storage import (
+    LOG_MODE, SEGMENT_MAX_SECONDS, SEGMENT_MAX_BYTES,
+    LOG_COMPRESSION, COMPRESSION_TOLERANCES, COMPRESSION_HEARTBEAT_SECONDS
+)
+
+
+def create_experiment_log(base_name, mode=LOG_MODE, compression=LOG_COMPRESSION):
+    '''base_name is the log path without extension, e.g. output/20250723_test'''
+    if mode == 'segmented':
+        log = SegmentedLog(base_name, max_seconds=SEGMENT_MAX_SECONDS, max_bytes=SEGMENT_MAX_BYTES)
+    elif mode == 'sqlite':
+        log = SqliteLog(base_name)
+    else:
+        log = CsvLog(base_name)
+
+    if compression:
+        # Imported here as compressed_log reads logs back through this module
+        from storage.compressed_log import CompressedLog
+        log = CompressedLog(log, compression, tolerances=COMPRESSION_TOLERANCES, heartbeat_seconds=COMPRESSION_HEARTBEAT_SECONDS)
+    return log
+
+
+def read_experiment_log(file_name):
+    '''Yield every row of an experiment log, header included, whichever format it was written in'''
+    if file_name.endswith(MANIFEST_SUFFIX):
+        yield from read_segmented_log(file_name)
+        return
+
+    with open(file_name, 'r', newline='') as f:
+        yield from csv.reader(f)
@@ -0,0 +1,150 @@
+import os
+import csv
+import gzip
+import json
+import time
+import queue
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+class SegmentedLog:
+    '''
+    Experiment log split into chunks for long runs.
+
+    Rows go to output/<name>/part0001.csv until the chunk is older than max_seconds or larger
+    than max_bytes, then the log rolls over to the next part. Finished parts are gzipped by a
+    background thread so the controller never waits on compression. The manifest
+    output/<name>.manifest.json holds the header rows and the ordered list of chunks.
+    '''
+    def __init__(self, base_name, max_seconds, max_bytes):
+        self.manifest_name = f'{base_name}{MANIFEST_SUFFIX}'
+        self.file_name = self.manifest_name
+        self.chunk_dir = base_name
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+        self.lock = threading.Lock()
+        self.manifest = {'header': [], 'chunks': [], 'complete': False}
+        self.file = None
+        self.writer = None
+        self.chunk = None
+        self.chunk_opened = None
+
+        self.compress_queue = queue.Queue()
+        self.compress_thread = threading.Thread(target=self.compress_chunks, daemon=True)
+        self.compress_thread.start()
+
+    def write_header(self, header_rows):
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        with self.lock:
+            self.manifest['header'] = [list(row) for row in header_rows]
+            self.open_chunk()
+
+    def write_sample(self, sample):
+        row = sample.to_row()
+        with self.lock:
+            if self.file is None:
+                return
+
+            if time.monotonic() - self.chunk_opened >= self.max_seconds or self.file.tell() >= self.max_bytes:
+                self.close_chunk()
+                self.open_chunk()
+
+            self.writer.writerow(row)
+            self.file.flush()
+
+            self.chunk['rows'] += 1
+            if self.chunk['first_time'] is None:
+                self.chunk['first_time'] = row[0]
+            self.chunk['last_time'] = row[0]
+
+    def write_event(self, event):
+        '''Events go into the current chunk between the samples, they never roll the log over'''
+        row = event.to_row()
+        with self.lock:
+            if self.file is None:
+                return
+            self.writer.writerow(row)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.close_chunk()
+                self.manifest['complete'] = True
+                self.save_manifest()
+
+        # Wait for the last chunk to be compressed, the thread is stopped even if no chunk was ever opened
+        self.compress_queue.put(None)
+        self.compress_thread.join()
+
+    def open_chunk(self):
+        '''Must be called with the lock held'''
+        file_name = f'part{len(self.manifest["chunks"]) + 1:04}.csv'
+        self.chunk = {'file': file_name, 'rows': 0, 'first_time': None, 'last_time': None, 'compressed': False}
+        self.manifest['chunks'].append(self.chunk)
+
+        self.file = open(os.path.join(self.chunk_dir, file_name), 'w', newline='')
+        self.writer = csv.writer(self.file, quoting=csv.QUOTE_ALL)
+        self.chunk_opened = time.monotonic()
+        self.save_manifest()
+
+    def close_chunk(self):
+        '''Must be called with the lock held'''
+        self.file.close()
+        self.file = None
+        self.save_manifest()
+        self.compress_queue.put(self.chunk)
+
+    def compress_chunks(self):
+        while True:
+            chunk = self.compress_queue.get()
+            if chunk is None:
+                return
+
+            source = os.path.join(self.chunk_dir, chunk['file'])
+            try:
+                with open(source, 'rb') as f_in, gzip.open(f'{source}.gz', 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+            except OSError as e:
+                logger.error(f'Could not compress log chunk {source}. Error: {e}')
+                continue
+
+            with self.lock:
+                chunk['file'] = f'{chunk["file"]}.gz'
+                chunk['compressed'] = True
+                self.save_manifest()
+            os.remove(source)
+            logger.debug(f'Compressed log chunk {source}')
+
+    def save_manifest(self):
+        '''Must be called with the lock held, written to a temporary file first so readers never see half a manifest'''
+        temp_name = f'{self.manifest_name}.tmp'
+        with open(temp_name, 'w') as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(temp_name, self.manifest_name)
+
+
+def read_segmented_log(manifest_name):
+    '''Yield the rows of a segmented log in the same order as a single-file experiment log, header included'''
+    with open(manifest_name, 'r') as f:
+        manifest = json.load(f)
+    chunk_dir = manifest_name[:-len(MANIFEST_SUFFIX)]
+
+    yield from manifest['header']
+
+    for chunk in manifest['chunks']:
+        path = os.path.join(chunk_dir, chunk['file'])
+        # The chunk may have been compressed after the manifest was read
+        if not os.path.exists(path) and os.path.exists(f'{path}.gz'):
+            path = f'{path}.gz'
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', newline='') as f:
+            yield from csv.reader(f)
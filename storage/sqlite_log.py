@@ -0,0 +1,254 @@
+import re
+import csv
+import json
+import heapq
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from constants.storage import SQLITE_DB_NAME, SQLITE_BATCH_SIZE, SQLITE_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    created TEXT,
+    header TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER REFERENCES runs(id),
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS samples_run_timestamp ON samples(run_id, timestamp);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER REFERENCES runs(id),
+    timestamp REAL,
+    kind TEXT,
+    name TEXT,
+    value TEXT,
+    unit TEXT,
+    detail TEXT
+);
+'''
+
+# Data headers holding flags, which SQLite stores as 1/0, read back as True/False like the CSV has them
+FLAG_COLUMNS = ('Pump running',)
+
+
+def column_name(header):
+    '''SQL column for a data header, e.g. 'Pump speed' -> pump_speed'''
+    return re.sub(r'[^0-9a-z]+', '_', header.lower()).strip('_')
+
+
+def connect(db_name):
+    connection = sqlite3.connect(db_name, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def ensure_columns(connection, data_header):
+    '''Add a column to the samples table for every data header it does not have yet'''
+    existing = {row[1] for row in connection.execute('PRAGMA table_info(samples)')}
+    for header in data_header:
+        name = column_name(header)
+        if name not in existing:
+            connection.execute(f'ALTER TABLE samples ADD COLUMN "{name}"')
+            existing.add(name)
+
+
+class SqliteLog:
+    '''
+    Experiment log stored in a local SQLite database (WAL mode) instead of a CSV file.
+
+    Samples are handed to a dedicated writer thread through a queue and inserted in batches
+    of up to SQLITE_BATCH_SIZE, or every SQLITE_FLUSH_INTERVAL seconds, in a single transaction.
+    Every run gets a row in the runs table, its samples are indexed by (run_id, timestamp).
+    Events go through the same queue into the events table.
+    '''
+    def __init__(self, base_name, db_name=SQLITE_DB_NAME):
+        self.name = base_name
+        self.db_name = db_name
+        self.file_name = db_name
+        self.run_id = None
+        self.columns = []
+
+        self.sample_queue = queue.Queue()
+        self.writer_thread = None
+
+    def write_header(self, header_rows):
+        header_rows = [list(row) for row in header_rows]
+        data_header = header_rows[-1]
+
+        connection = connect(self.db_name)
+        with connection:
+            ensure_columns(connection, data_header)
+            cursor = connection.execute(
+                'INSERT INTO runs (name, created, header) VALUES (?, ?, ?)',
+                (self.name, datetime.now().isoformat(), json.dumps(header_rows))
+            )
+        self.run_id = cursor.lastrowid
+        self.columns = ['run_id', 'timestamp'] + [column_name(header) for header in data_header]
+
+        self.writer_thread = threading.Thread(target=self.write_batches, args=(connection,), daemon=True)
+        self.writer_thread.start()
+
+    def write_sample(self, sample):
+        if self.writer_thread is None:
+            return
+        row = [self.run_id, sample.time.timestamp()] + [None if cell == '' else cell for cell in sample.to_row()]
+        self.sample_queue.put(row)
+
+    def write_event(self, event):
+        if self.writer_thread is None:
+            return
+        _, _, kind, name, value, unit, detail = event.to_row()
+        # A tuple rather than a list tells the writer thread it is an event
+        self.sample_queue.put((self.run_id, event.time.timestamp(), kind, name, str(value), unit, detail))
+
+    def close(self):
+        if self.writer_thread is None:
+            return
+        self.sample_queue.put(None)
+        self.writer_thread.join()
+        self.writer_thread = None
+
+    def write_batches(self, connection):
+        columns = ', '.join(f'"{column}"' for column in self.columns)
+        placeholders = ', '.join('?' for _ in self.columns)
+        statement = f'INSERT INTO samples ({columns}) VALUES ({placeholders})'
+        event_statement = 'INSERT INTO events (run_id, timestamp, kind, name, value, unit, detail) VALUES (?, ?, ?, ?, ?, ?, ?)'
+
+        finished = False
+        while not finished:
+            batch = []
+            events = []
+            try:
+                # Block for the first sample, then drain whatever else arrives within the flush interval
+                row = self.sample_queue.get()
+                while row is not None:
+                    (events if isinstance(row, tuple) else batch).append(row)
+                    if len(batch) >= SQLITE_BATCH_SIZE:
+                        break
+                    row = self.sample_queue.get(timeout=SQLITE_FLUSH_INTERVAL)
+                finished = row is None
+            except queue.Empty:
+                pass
+
+            if batch or events:
+                try:
+                    with connection:
+                        connection.executemany(statement, batch)
+                        connection.executemany(event_statement, events)
+                except sqlite3.Error as e:
+                    logger.error(f'Could not write {len(batch)} sample(s) and {len(events)} event(s) to {self.db_name}. Error: {e}')
+
+        connection.close()
+
+
+class SampleDatabase:
+    '''Read access to the runs and samples in the SQLite sample database'''
+    def __init__(self, db_name=SQLITE_DB_NAME):
+        self.db_name = db_name
+
+    def list_runs(self):
+        connection = connect(self.db_name)
+        try:
+            return [
+                {'id': run_id, 'name': name, 'created': created}
+                for run_id, name, created in connection.execute('SELECT id, name, created FROM runs ORDER BY id')
+            ]
+        finally:
+            connection.close()
+
+    def query_samples(self, run_id, start=None, end=None, timestamps=False):
+        '''
+        Data rows of a run in the CSV column order, optionally limited to start <= time < end
+        (datetimes), using the (run_id, timestamp) index. With timestamps, (timestamp, row) pairs.
+        '''
+        connection = connect(self.db_name)
+        try:
+            data_header = self.get_header(connection, run_id)[-1]
+            columns = ', '.join(['timestamp'] + [f'"{column_name(header)}"' for header in data_header])
+            flags = [index for index, header in enumerate(data_header) if header in FLAG_COLUMNS]
+
+            conditions = ['run_id = ?']
+            values = [run_id]
+            if start is not None:
+                conditions.append('timestamp >= ?')
+                values.append(start.timestamp())
+            if end is not None:
+                conditions.append('timestamp < ?')
+                values.append(end.timestamp())
+
+            rows = connection.execute(
+                f'SELECT {columns} FROM samples WHERE {" AND ".join(conditions)} ORDER BY timestamp',
+                values
+            )
+            for timestamp, *row in rows:
+                for index in flags:
+                    if row[index] is not None:
+                        row[index] = bool(row[index])
+                yield (timestamp, tuple(row)) if timestamps else tuple(row)
+        finally:
+            connection.close()
+
+    def query_events(self, run_id):
+        '''(timestamp, row) of every event of a run, the row as the CSV log has it'''
+        # Imported here as experiment_file reads logs back through experiment_log, which imports this module
+        from storage.experiment_file import EVENT_MARKER
+
+        connection = connect(self.db_name)
+        try:
+            rows = connection.execute(
+                'SELECT timestamp, kind, name, value, unit, detail FROM events WHERE run_id = ? ORDER BY timestamp',
+                (run_id,)
+            )
+            return [
+                (timestamp, (datetime.fromtimestamp(timestamp).strftime('%H:%M:%S'), EVENT_MARKER, kind, name, value, unit, detail))
+                for timestamp, kind, name, value, unit, detail in rows
+            ]
+        finally:
+            connection.close()
+
+    def export_csv(self, run_id, file_name):
+        '''Write a run back out in the experiment CSV layout, header and events included'''
+        connection = connect(self.db_name)
+        try:
+            header_rows = self.get_header(connection, run_id)
+        finally:
+            connection.close()
+
+        # Events go between the samples where they happened, after a sample of the same timestamp
+        rows = heapq.merge(self.query_samples(run_id, timestamps=True), self.query_events(run_id), key=lambda row: row[0])
+        with open(file_name, 'w', newline='') as file:
+            wr = csv.writer(file, quoting=csv.QUOTE_ALL)
+            wr.writerows(header_rows)
+            for _, row in rows:
+                wr.writerow(['' if cell is None else cell for cell in row])
+
+        logger.info(f'Exported run {run_id} to {file_name}')
+
+    def get_header(self, connection, run_id):
+        row = connection.execute('SELECT header FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'No run with id {run_id} in {self.db_name}')
+        return json.loads(row[0])
+
+
+if __name__ == '__main__':
+    # python -m storage.sqlite_log                      -> list runs
+    # python -m storage.sqlite_log <run id> <file.csv>  -> export a run as an experiment CSV
+    import sys
+
+    database = SampleDatabase()
+    if len(sys.argv) == 3:
+        database.export_csv(int(sys.argv[1]), sys.argv[2])
+    else:
+        for run in database.list_runs():
+            print(f'{run["id"]:>4}  {run["created"]}  {run["name"]}')
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from components.command_queue import QueuedDevice, ESTOP, COMMAND_TIMEOUT
+
+
+class SlowDevice:
+    '''Records the order commands reach it, the first read holds the port until released'''
+    def __init__(self):
+        self.calls = []
+        self.on_wire = threading.Event()
+        self.release = threading.Event()
+
+    def get_reading(self, index):
+        if not self.calls:
+            self.on_wire.set()
+            self.release.wait(COMMAND_TIMEOUT)
+        self.calls.append(f'poll {index}')
+        return index
+
+    def stop(self):
+        self.calls.append('stop')
+
+    def emergency(self):
+        self.calls.append('estop')
+
+    def close(self):
+        pass
+
+
+def test_stops_go_ahead_of_queued_polls():
+    device = SlowDevice()
+    queued = QueuedDevice(device, 'slow')
+
+    polls = [queued.submit('get_reading', 0)]
+    assert device.on_wire.wait(COMMAND_TIMEOUT)
+    polls.extend(queued.submit('get_reading', index) for index in range(1, 4))
+    stop = queued.submit('stop')
+    estop = queued.submit('emergency', priority=ESTOP)
+
+    device.release.set()
+    stop.result(timeout=COMMAND_TIMEOUT)
+    estop.result(timeout=COMMAND_TIMEOUT)
+    assert [poll.result(timeout=COMMAND_TIMEOUT) for poll in polls] == [0, 1, 2, 3]
+
+    # The read on the wire finishes first, then the emergency stop, the stop, and the polls in order
+    assert device.calls == ['poll 0', 'estop', 'stop', 'poll 1', 'poll 2', 'poll 3']
+    queued.close()
+
+
+def test_proxy_call_waits_for_result_and_raises_errors():
+    class FailingDevice:
+        def get_reading(self):
+            raise OSError('no answer')
+
+        def close(self):
+            pass
+
+    queued = QueuedDevice(FailingDevice(), 'failing')
+    with pytest.raises(OSError, match='no answer'):
+        queued.get_reading()
+    queued.close()
@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from components.powerSupply import PowerSupplyReading
+from controller.sample import Sample, data_header
+from storage.compressed_log import CompressedLog, read_uniform
+from storage.csv_log import CsvLog
+from storage.experiment_file import ExperimentFile, to_float
+
+TOLERANCE = 0.5
+
+
+def noisy_ramp(samples, seed):
+    '''Voltage ramping up then down with noise of a quarter of the tolerance, one sample a second'''
+    rng = random.Random(seed)
+    start = datetime(2025, 7, 23, 12)
+    for index in range(samples):
+        level = 0.05 * index if index < samples // 2 else 0.05 * (samples - index)
+        # Samples are taken anywhere within their second, the log only has whole seconds
+        time = start + timedelta(seconds=index + rng.uniform(0, 0.99))
+        yield Sample(time, psu=PowerSupplyReading(voltage=level + rng.gauss(0, TOLERANCE / 4), current=1.0))
+
+
+@pytest.mark.parametrize('method', ['deadband', 'swinging_door'])
+@pytest.mark.parametrize('seed', range(5))
+def test_reconstruction_within_tolerance(tmp_path, method, seed):
+    log = CompressedLog(CsvLog(tmp_path / 'run'), method, tolerances={'Voltage': TOLERANCE}, heartbeat_seconds=300)
+    log.write_header([['Author', 'test'], ['Experiment name', 'ramp'], [''], data_header()])
+    samples = list(noisy_ramp(2000, seed))
+    for sample in samples:
+        log.write_sample(sample)
+    log.close()
+
+    rebuilt = {row[0]: to_float(row[1]) for row in read_uniform(log.file_name, interval_seconds=1)}
+    with ExperimentFile(log.file_name) as experiment:
+        logged = sum(1 for _ in experiment.data_rows())
+    assert logged < len(samples) / 4
+
+    for sample in samples:
+        time = sample.time.strftime('%H:%M:%S')
+        assert abs(rebuilt[time] - sample.psu.voltage) <= TOLERANCE + 1e-9, f'{method} at {time}'
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+import controller.health
+from components.command_queue import QueuedDevice
+from controller.health import DeviceHealth, HEALTHY, DEGRADED
+from constants.health import DEVICE_FAILURES_TO_DEGRADE
+
+
+class FlakyDevice:
+    def __init__(self):
+        self.answering = False
+
+    def get_reading(self):
+        if not self.answering:
+            raise OSError('no answer')
+        return 1.0
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def device():
+    device = QueuedDevice(FlakyDevice(), 'flaky')
+    yield device
+    device.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_probe(monkeypatch):
+    monkeypatch.setattr(controller.health, 'DEVICE_PROBE_INTERVAL', 0.01)
+
+
+def test_degrades_after_failures_in_a_row(device):
+    changes = []
+    health = DeviceHealth('psu', device, on_change=lambda key, state: changes.append((key, state)))
+
+    for _ in range(DEVICE_FAILURES_TO_DEGRADE - 1):
+        health.record_failure('timed out')
+    # A good read in between starts the count again
+    health.record_success()
+    for _ in range(DEVICE_FAILURES_TO_DEGRADE - 1):
+        health.record_failure('timed out')
+    assert health.state == HEALTHY
+    assert health.submit_read() is not None
+
+    health.record_failure('timed out')
+    assert health.state == DEGRADED
+    assert changes == [('psu', DEGRADED)]
+    # Left out of the cycle while degraded
+    assert health.submit_read() is None
+
+
+def test_recovers_on_successful_probe(device):
+    changes = []
+    health = DeviceHealth('psu', device, on_change=lambda key, state: changes.append((key, state)))
+    for _ in range(DEVICE_FAILURES_TO_DEGRADE):
+        health.record_failure('timed out')
+    assert health.state == DEGRADED
+
+    # Probes keep failing while the device does not answer
+    time.sleep(0.1)
+    assert health.state == DEGRADED
+
+    device.device.answering = True
+    assert wait_for(lambda: health.state == HEALTHY)
+    assert wait_for(lambda: changes == [('psu', DEGRADED), ('psu', HEALTHY)])
+    assert health.failures == 0
+    assert health.submit_read() is not None
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from components.powerSupply import PowerSupplyReading
+from components.pump import PumpReading
+from controller.controller import Controller
+from controller.interlocks import InterlockEngine
+from controller.sample import Sample
+
+START = datetime(2025, 7, 23, 12)
+
+
+def make_sample(index, voltage=2.5, current=0.1, channels=(), pump=True):
+    return Sample(
+        time=START + timedelta(seconds=index),
+        psu=PowerSupplyReading(voltage=voltage, current=current),
+        pump=PumpReading(speed=60.0, running=True) if pump else None,
+        psu_channels=tuple(channels)
+    )
+
+
+class StubDevice:
+    def __init__(self):
+        self.stops = 0
+
+    def stop(self):
+        self.stops += 1
+
+
+class StubApp:
+    def __init__(self):
+        self.trips = []
+
+    def interlock_tripped(self, trip):
+        self.trips.append(trip)
+
+
+def test_threshold_trips_on_any_psu_channel():
+    engine = InterlockEngine([{'type': 'threshold', 'channel': 'psu.current', 'max': 2.0}])
+
+    assert engine.evaluate(make_sample(0, channels=[PowerSupplyReading(1.0, 1.5), None])) == []
+
+    trips = engine.evaluate(make_sample(1, channels=[PowerSupplyReading(1.0, 1.5), PowerSupplyReading(1.0, 2.5)]))
+    assert len(trips) == 1
+    assert trips[0].action == 'shutdown'
+    assert 'channel 3' in trips[0].message
+
+
+def test_rate_rule_needs_two_samples():
+    engine = InterlockEngine([{'type': 'rate', 'channel': 'psu.voltage', 'max_rate': 1.0}])
+
+    # A single sample has no rate, however high the value
+    assert engine.evaluate(make_sample(0, voltage=50.0)) == []
+    assert engine.evaluate(make_sample(1, voltage=50.5)) == []
+
+    trips = engine.evaluate(make_sample(2, voltage=55.0))
+    assert len(trips) == 1
+    assert '4.500/s' in trips[0].message
+
+
+def test_not_responding_fires_once_after_gap():
+    controller = Controller(StubApp())
+    controller.pump = StubDevice()
+    controller.interlocks = InterlockEngine([{'type': 'not_responding', 'device': 'pump', 'samples': 3, 'action': 'stop_pump'}])
+
+    for index in range(2):
+        controller.check_interlocks(make_sample(index, pump=False), received_time=0)
+    assert controller.parent.trips == []
+
+    # An answer in between starts the count again
+    controller.check_interlocks(make_sample(2), received_time=0)
+    for index in range(3, 5):
+        controller.check_interlocks(make_sample(index, pump=False), received_time=0)
+    assert controller.parent.trips == []
+
+    # Tripped on the third missed sample, then latched rather than stopping the pump every cycle
+    for index in range(5, 10):
+        controller.check_interlocks(make_sample(index, pump=False), received_time=0)
+    assert len(controller.parent.trips) == 1
+    assert controller.parent.trips[0].rule == 'pump not responding'
+    assert controller.pump.stops == 1
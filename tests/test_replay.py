@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from components.powerSupply import PowerSupplyReading
+from controller.replay import Replay
+from controller.sample import Sample, Event, data_header
+from storage.csv_log import CsvLog
+
+START = datetime(2025, 7, 23, 12)
+
+
+def record_run(base_name):
+    log = CsvLog(base_name)
+    log.write_header([['Author', 'test'], ['Experiment name', 'replay'], [''], data_header()])
+    for index in range(4):
+        time = START + timedelta(seconds=index)
+        log.write_sample(Sample(time, psu=PowerSupplyReading(voltage=2.5 + index, current=0.1)))
+        if index == 1:
+            log.write_event(Event(time, 'Setpoint', 'Voltage', 4.5, 'V'))
+        if index == 2:
+            log.write_event(Event(time, 'Interlock', 'psu.current outside [None, 2.0]', 'shutdown', detail='tripped'))
+    log.close()
+    return log.file_name
+
+
+def test_events_replayed_in_order_with_samples(tmp_path):
+    file_name = record_run(tmp_path / '20250723_replay')
+    played = []
+    replay = Replay(
+        file_name, speed=1000,
+        on_sample=lambda sample: played.append(('sample', sample.time, sample.psu.voltage)),
+        on_event=lambda event: played.append(('event', event.time, event.kind, event.name, event.value, event.unit, event.detail))
+    )
+    replay.run()
+
+    assert played == [
+        ('sample', START, 2.5),
+        ('sample', START + timedelta(seconds=1), 3.5),
+        ('event', START + timedelta(seconds=1), 'Setpoint', 'Voltage', 4.5, 'V', ''),
+        ('sample', START + timedelta(seconds=2), 4.5),
+        ('event', START + timedelta(seconds=2), 'Interlock', 'psu.current outside [None, 2.0]', 'shutdown', '', 'tripped'),
+        ('sample', START + timedelta(seconds=3), 5.5)
+    ]
+    assert (replay.samples, replay.events) == (4, 2)
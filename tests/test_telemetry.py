@@ -0,0 +1,100 @@
+import json
+import time
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from components.powerSupply import PowerSupplyReading
+from components.pump import PumpReading
+from controller.pipeline import SamplePipeline
+from controller.sample import Sample
+from controller.telemetry import TelemetryServer
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def make_sample(index):
+    return Sample(
+        time=datetime(2025, 7, 23, 12) + timedelta(seconds=index),
+        psu=PowerSupplyReading(voltage=2.5, current=0.1 * index),
+        pump=PumpReading(speed=60.0, running=True)
+    )
+
+
+@pytest.fixture
+def server():
+    # Port 0 picks a free port on localhost
+    server = TelemetryServer(host='127.0.0.1', port=0, queue_size=4)
+    server.start()
+    yield server
+    server.stop()
+
+
+def connect(server, receive_buffer=None):
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if receive_buffer:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+    client.connect((server.host, server.port))
+    assert wait_for(lambda: len(server.subscribers) == 1)
+    return client
+
+
+def test_client_receives_state_and_samples(server):
+    pipeline = SamplePipeline()
+    pipeline.add_consumer(server)
+    client = connect(server)
+
+    with client, client.makefile('r') as stream:
+        pipeline.publish_state('running', experiment='test')
+        pipeline.publish_sample(make_sample(1))
+
+        state = json.loads(stream.readline())
+        sample = json.loads(stream.readline())
+
+    assert state['type'] == 'state'
+    assert state['state'] == 'running'
+    assert state['experiment'] == 'test'
+    assert sample['type'] == 'sample'
+    assert sample['psu'] == {'voltage': 2.5, 'current': 0.1}
+    assert sample['mfc'] is None
+
+
+def test_new_client_gets_last_state_and_sample(server):
+    pipeline = SamplePipeline()
+    pipeline.add_consumer(server)
+    pipeline.publish_state('running')
+    pipeline.publish_sample(make_sample(2))
+
+    client = connect(server)
+    with client, client.makefile('r') as stream:
+        assert json.loads(stream.readline())['state'] == 'running'
+        assert json.loads(stream.readline())['time'] == '2025-07-23T12:00:02'
+
+
+def test_slow_client_drops_frames_instead_of_blocking(server):
+    pipeline = SamplePipeline()
+    pipeline.add_consumer(server)
+    # A client that never reads, with small socket buffers on both ends so they fill up quickly
+    client = connect(server, receive_buffer=4096)
+    subscriber = server.subscribers[0]
+    subscriber.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+
+    samples = 20000
+    start = time.perf_counter()
+    for index in range(samples):
+        pipeline.publish_sample(make_sample(index))
+    elapsed = time.perf_counter() - start
+
+    with client:
+        # Publishing never waits on the client: far more was published than the sockets can hold
+        assert subscriber.dropped > 0
+        assert len(subscriber.messages) <= server.queue_size
+        assert elapsed / samples < 0.001